@@ -1,26 +1,105 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi import FastAPI, HTTPException, Request, Path as PathParam, Query
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any, Union
-from datetime import datetime
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, Union, Tuple
+from datetime import datetime, timedelta
 import pyodbc
 import os
+import io
+import csv
 import json
+import zlib
+import base64
+import codecs
 import logging
+import asyncio
+import threading
+import time
+import queue
+import contextvars
+import secrets
+import random
+import atexit
+import logging.handlers
+import re
+import gzip
+import hashlib
+import mimetypes
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json estándar si no está instalado
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan variantes gzip
+    brotli = None
 
 # Cargar variables de entorno
 load_dotenv()
 
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Leer una variable de entorno booleana (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Configuración de logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE = env_flag("LOG_QUEUE", True)
+# "structured": una línea por petición MCP; "verbose": vuelca headers y body (debug)
+MCP_LOG_MODE = os.getenv("MCP_LOG_MODE", "structured").lower()
+MCP_LOG_BODY_SAMPLE_RATE = float(os.getenv("MCP_LOG_BODY_SAMPLE_RATE", "0.01"))
+MCP_LOG_BODY_MAX_BYTES = int(os.getenv("MCP_LOG_BODY_MAX_BYTES", "1024"))
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que loguea: el mensaje se
+    compone en el hilo del QueueListener. Los argumentos del log no deben
+    modificarse después de llamar al logger.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging():
+    """
+    Configurar logging. Con LOG_QUEUE, los handlers que escriben en stdout
+    corren en un hilo aparte (QueueListener) y el event loop solo encola.
+    """
+    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    if not LOG_QUEUE:
+        logging.basicConfig(level=LOG_LEVEL, format=log_format)
+        return
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(log_format))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.handlers = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop)
+
+
 # Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Versión del protocolo MCP (Copilot Studio requiere 2024-11-05)
@@ -29,6 +108,7 @@ MCP_PROTOCOL_VERSION = "2024-11-05"
 # Versiones compatibles del protocolo
 COMPATIBLE_MCP_VERSIONS = ["2024-11-05", "2025-06-18"]
 
+
 # Obtener configuración de base de datos desde .env
 HOST_DB = os.getenv("HOST_DB")
 ADMIN_DB = os.getenv("ADMIN_DB")
@@ -37,10 +117,120 @@ DATABASE_NAME = os.getenv("DATABASE_NAME", "master")
 PORT_DB = os.getenv("PORT_DB", "1433")
 DRIVER = os.getenv("DRIVER", "{ODBC Driver 18 for SQL Server}")
 
+# Batches JSON-RPC en /mcp
+MCP_BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "8"))
+MCP_BATCH_MAX_SIZE = int(os.getenv("MCP_BATCH_MAX_SIZE", "100"))
+
+# Transporte Streamable HTTP (SSE) en /mcp
+MCP_SSE_ENABLED = env_flag("MCP_SSE_ENABLED", True)
+MCP_SSE_PING_INTERVAL = float(os.getenv("MCP_SSE_PING_INTERVAL", "15"))
+MCP_SSE_MAX_STREAMS = int(os.getenv("MCP_SSE_MAX_STREAMS", "100"))
+MCP_SSE_QUEUE_SIZE = int(os.getenv("MCP_SSE_QUEUE_SIZE", "100"))
+
+# Sesiones MCP (Mcp-Session-Id)
+MCP_SESSION_MAX = int(os.getenv("MCP_SESSION_MAX", "1000"))
+MCP_SESSION_IDLE_TTL = float(os.getenv("MCP_SESSION_IDLE_TTL", "1800"))
+
+# Caché HTTP de lecturas de scores (ETag + Cache-Control)
+SCORES_CACHE_MAX_AGE = int(os.getenv("SCORES_CACHE_MAX_AGE", "5"))
+SCORES_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("SCORES_CACHE_STALE_WHILE_REVALIDATE", "30"))
+
+# Caché de resultados de tools MCP (por tool + argumentos)
+MCP_TOOL_CACHE_SIZE = int(os.getenv("MCP_TOOL_CACHE_SIZE", "256"))
+MCP_TOOL_CACHE_TTL = float(os.getenv("MCP_TOOL_CACHE_TTL", "30"))
+
+# Configuración del pool de conexiones
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+DB_POOL_VALIDATE_AFTER = float(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))
+DB_POOL_MAX_STATEMENTS = int(os.getenv("DB_POOL_MAX_STATEMENTS", "20"))
+
+# Configuración del executor de base de datos (hilos dedicados a pyodbc)
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_MAX_SIZE)))
+DB_EXECUTOR_QUEUE_SIZE = int(os.getenv("DB_EXECUTOR_QUEUE_SIZE", "100"))
+DB_CALL_TIMEOUT = float(os.getenv("DB_CALL_TIMEOUT", "30"))
+
+# Health checks: sondeo de la BD en segundo plano
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+HEALTH_PROBE_MAX_AGE = float(os.getenv("HEALTH_PROBE_MAX_AGE", str(HEALTH_PROBE_INTERVAL * 3)))
+
+# Control de admisión por ruta (concurrencia y cola acotadas)
+ADMISSION_CONTROL = env_flag("ADMISSION_CONTROL", True)
+# "ruta=concurrencia:cola,..." para sobrescribir los límites por defecto
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "")
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Rechazar de inmediato las rutas que van a la BD si el último health probe falló
+ADMISSION_SHED_WHEN_DB_DOWN = env_flag("ADMISSION_SHED_WHEN_DB_DOWN", True)
+
+# Caché en memoria del leaderboard (top K); tamaño 0 la desactiva
+LEADERBOARD_CACHE_SIZE = int(os.getenv("LEADERBOARD_CACHE_SIZE", "100"))
+LEADERBOARD_CACHE_TTL = float(os.getenv("LEADERBOARD_CACHE_TTL", "60"))
+
+# Leaderboards por ventana (diario/semanal/mensual) y tabla resumen opcional
+LEADERBOARD_WINDOW_SIZE = int(os.getenv("LEADERBOARD_WINDOW_SIZE", str(LEADERBOARD_CACHE_SIZE)))
+LEADERBOARD_WINDOW_SUMMARY = env_flag("LEADERBOARD_WINDOW_SUMMARY")
+
+# Write-behind: agrupar los inserts de scores en lotes (desactivado por defecto)
+SCORE_WRITE_BEHIND = env_flag("SCORE_WRITE_BEHIND")
+SCORE_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("SCORE_WRITE_BEHIND_BATCH_SIZE", "100"))
+SCORE_WRITE_BEHIND_INTERVAL_MS = float(os.getenv("SCORE_WRITE_BEHIND_INTERVAL_MS", "50"))
+SCORE_WRITE_BEHIND_MAX_PENDING = int(os.getenv("SCORE_WRITE_BEHIND_MAX_PENDING", "1000"))
+
+# Ingesta masiva de scores (POST /api/snake-scores/batch)
+BATCH_INSERT_CHUNK_SIZE = int(os.getenv("BATCH_INSERT_CHUNK_SIZE", "500"))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "50000"))
+
+# Score máximo aceptado al guardar (la columna es INT)
+SCORE_MAX_VALUE = int(os.getenv("SCORE_MAX_VALUE", "1000000"))
+
+# Límites de paginación
+TOP_SCORES_MAX_LIMIT = int(os.getenv("TOP_SCORES_MAX_LIMIT", "500"))
+PLAYER_SCORES_PAGE_SIZE = int(os.getenv("PLAYER_SCORES_PAGE_SIZE", "100"))
+PLAYER_SCORES_MAX_PAGE_SIZE = int(os.getenv("PLAYER_SCORES_MAX_PAGE_SIZE", "500"))
+
+# Exportación de scores: filas por fetchmany
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+
+# Ranking de jugadores en memoria: intervalo de resincronización con la BD
+RANKING_RESYNC_INTERVAL = float(os.getenv("RANKING_RESYNC_INTERVAL", "300"))
+
+# Réplica de lectura en memoria de dbo.SnakeScores para top y player (desactivada por defecto)
+READ_REPLICA_ENABLED = env_flag("READ_REPLICA_ENABLED")
+READ_REPLICA_POLL_INTERVAL = float(os.getenv("READ_REPLICA_POLL_INTERVAL", "1"))
+# Retraso máximo aceptado (segundos); si la réplica va más atrasada se lee de la BD
+READ_REPLICA_MAX_STALENESS = float(os.getenv("READ_REPLICA_MAX_STALENESS", "5"))
+READ_REPLICA_BATCH_SIZE = int(os.getenv("READ_REPLICA_BATCH_SIZE", "10000"))
+# Filas máximas en memoria: si la tabla es más grande la réplica se desactiva
+READ_REPLICA_MAX_ROWS = int(os.getenv("READ_REPLICA_MAX_ROWS", "1000000"))
+
 # Configurar rutas
 BASE_DIR = Path(__file__).resolve().parent.parent
 WWW_DIR = BASE_DIR / "www"
 
+# Archivos estáticos servidos desde un manifest en memoria
+STATIC_MANIFEST = env_flag("STATIC_MANIFEST", True)
+STATIC_MAX_INMEMORY_BYTES = int(os.getenv("STATIC_MAX_INMEMORY_BYTES", str(8 * 1024 * 1024)))
+STATIC_COMPRESS_MIN_BYTES = int(os.getenv("STATIC_COMPRESS_MIN_BYTES", "1024"))
+STATIC_DEFAULT_MAX_AGE = int(os.getenv("STATIC_DEFAULT_MAX_AGE", "3600"))
+
+# Métricas Prometheus en /metrics
+METRICS_ENABLED = env_flag("METRICS_ENABLED", True)
+
+# Trazas por petición (opt-in) y log de peticiones lentas
+TRACING_ENABLED = env_flag("TRACING_ENABLED", False)
+TRACE_SLOW_REQUEST_MS = float(os.getenv("TRACE_SLOW_REQUEST_MS", "500"))
+TRACE_SLOW_QUERY_MS = float(os.getenv("TRACE_SLOW_QUERY_MS", "200"))
+# SET STATISTICS TIME, IO ON en las conexiones: se adjunta a las consultas lentas
+TRACE_SQL_STATISTICS = env_flag("TRACE_SQL_STATISTICS", False)
+# Archivo JSONL con las trazas (vacío = no se exportan); por defecto solo las lentas
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_EXPORT_ALL = env_flag("TRACE_EXPORT_ALL", False)
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+
 
 def get_db_connection_string():
     """Construir la cadena de conexión a la base de datos"""
@@ -56,542 +246,4568 @@ def get_db_connection_string():
     )
 
 
-def test_database_connection():
-    """Probar la conexión a la base de datos"""
-    try:
-        conn_string = get_db_connection_string()
-        conn = pyodbc.connect(conn_string)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return True, "Database connection successful"
-    except Exception as e:
-        return False, str(e)
-
+# ============================================================
+# Métricas (formato de texto Prometheus)
+# ============================================================
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Gestionar el ciclo de vida de la aplicación"""
-    # Startup
-    print("Starting up FastAPI application...")
-    success, message = test_database_connection()
-    if success:
-        print(f"✓ {message}")
-    else:
-        print(f"✗ Database connection failed: {message}")
-    
-    yield
-    
-    # Shutdown
-    print("Shutting down FastAPI application...")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
 
 
-# Crear la aplicación FastAPI
-app = FastAPI(
-    title="miApp API",
-    description="API con FastAPI y conexión a Azure SQL Database",
-    version="1.0.0",
-    lifespan=lifespan
-)
+class HistogramChild:
+    """
+    Histograma con buckets fijos: los contadores se reservan al crearlo y
+    observar es una búsqueda binaria más un incremento bajo un lock propio
+    (sin contención entre series distintas).
+    """
+    __slots__ = ("bounds", "counts", "sum", "_lock")
 
-# Configurar CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Permitir todos los orígenes en producción
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
 
-# Montar archivos estáticos del frontend Angular
-if WWW_DIR.exists():
-    app.mount("/assets", StaticFiles(directory=str(WWW_DIR / "assets")), name="assets")
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
 
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
 
-# ============================================================
-# Modelos Pydantic para Snake Scores
-# ============================================================
 
-class SnakeScoreCreate(BaseModel):
-    PlayerName: str
-    Score: int
+class CounterChild:
+    __slots__ = ("value", "_lock")
 
-class SnakeScoreResponse(BaseModel):
-    Id: int
-    PlayerName: str
-    Score: int
-    GameDate: str
-    CreatedAt: str
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
 
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
 
-# ============================================================
-# Modelos Pydantic para MCP Tools (JSON-RPC 2.0)
-# ============================================================
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
 
-class JSONRPCRequest(BaseModel):
-    jsonrpc: str = "2.0"
-    method: str
-    params: Optional[Dict[str, Any]] = None
-    id: Optional[Union[str, int]] = None
 
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
 
-class JSONRPCError(BaseModel):
-    code: int
-    message: str
-    data: Optional[Any] = None
 
+class MetricFamily:
+    """Métrica con etiquetas: una serie (child) por combinación de valores"""
 
-class JSONRPCResponse(BaseModel):
-    jsonrpc: str = "2.0"
-    result: Optional[Any] = None
-    error: Optional[JSONRPCError] = None
-    id: Optional[Union[str, int]] = None
+    def __init__(self, name: str, help_text: str, metric_type: str,
+                 labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.type = metric_type
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
 
+    def labels(self, *values: Any):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = HistogramChild(self.buckets) if self.type == "histogram" else CounterChild()
+                    self._children[key] = child
+        return child
 
-class MCPToolCall(BaseModel):
-    tool_name: str
-    arguments: Optional[Dict[str, Any]] = None
+    def _label_text(self, key: Tuple[str, ...], le: Optional[str] = None) -> str:
+        pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(self.labelnames, key)]
+        if le is not None:
+            pairs.append(f'le="{le}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
 
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.type}")
+        for key, child in list(self._children.items()):
+            if self.type != "histogram":
+                lines.append(f"{self.name}{self._label_text(key)} {child.value}")
+                continue
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, str(bound))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{self._label_text(key, '+Inf')} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
 
-class MCPToolResponse(BaseModel):
-    success: bool
-    result: Any
-    error: Optional[str] = None
 
+class MetricsRegistry:
+    """Registro de métricas; las gauges de estado se leen al hacer scrape"""
 
-@app.get("/api")
-async def api_root():
-    """Endpoint raíz de la API"""
-    return {
-        "message": "Bienvenido a miApp API",
-        "version": "1.0.0",
-        "endpoints": {
-            "health": "/health",
-            "docs": "/docs",
-            "redoc": "/redoc",
-            "api": "/api",
-            "mcp": {
-                "list_tools": "/api/mcp/tools",
-                "call_tool": "/api/mcp/call-tool"
-            }
-        }
-    }
+    def __init__(self):
+        self._families: List[MetricFamily] = []
+        self._gauge_callbacks: List[Tuple[str, str, Any]] = []
 
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> MetricFamily:
+        family = MetricFamily(name, help_text, "counter", labelnames)
+        self._families.append(family)
+        return family
 
-# ============================================================
-# Endpoints para MCP Tools (JSON-RPC 2.0)
-# ============================================================
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> MetricFamily:
+        family = MetricFamily(name, help_text, "gauge", labelnames)
+        self._families.append(family)
+        return family
 
-@app.get("/mcp")
-async def mcp_info():
-    """Verificar que el endpoint MCP está activo"""
-    return {
-        "status": "ready",
-        "protocol": "MCP",
-        "version": MCP_PROTOCOL_VERSION,
-        "transport": "http"
-    }
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        family = MetricFamily(name, help_text, "histogram", labelnames, buckets)
+        self._families.append(family)
+        return family
 
+    def gauge_callback(self, name: str, help_text: str, callback):
+        """Gauge calculada en el scrape: `callback()` devuelve {etiquetas: valor} o un número"""
+        self._gauge_callbacks.append((name, help_text, callback))
 
-@app.post("/mcp")
-async def mcp_jsonrpc_handler(raw_request: Request):
-    """
-    Manejador principal de JSON-RPC 2.0 para MCP.
-    Soporta los métodos estándar de MCP.
-    """
-    req_body = None
-    try:
-        # Logging de headers para debugging
-        logger.info("=== MCP Request Headers ===")
-        for header_name, header_value in raw_request.headers.items():
-            if header_name.lower() == "authorization":
-                logger.info(f"  {header_name}: [REDACTED]")
-            else:
-                logger.info(f"  {header_name}: {header_value}")
-        
-        # Obtener el body JSON
-        req_body = await raw_request.json()
-        logger.info(f"MCP Request body: {json.dumps(req_body)}")
-        
-        # Validar estructura JSON-RPC
-        if not isinstance(req_body, dict):
-            return JSONRPCResponse(
-                error=JSONRPCError(
-                    code=-32600,
-                    message="Invalid Request: body must be a JSON object"
-                ),
-                id=None
-            )
-        
-        jsonrpc_version = req_body.get("jsonrpc")
-        method = req_body.get("method")
-        request_id = req_body.get("id")
-        params = req_body.get("params", {})
-        
-        # Validar versión JSON-RPC
-        if jsonrpc_version != "2.0":
-            return JSONRPCResponse(
-                error=JSONRPCError(
-                    code=-32600,
-                    message="Invalid Request: jsonrpc must be 2.0"
-                ),
-                id=request_id
-            )
-        
-        # Manejar respuestas del cliente (tienen id pero no method)
-        if not method and request_id is not None:
-            logger.info("Received response from client, returning 202 Accepted")
-            return Response(status_code=202)
-        
-        # Validar que tenga método
-        if not method:
-            return JSONRPCResponse(
-                error=JSONRPCError(
-                    code=-32600,
-                    message="Invalid Request: method is required"
-                ),
-                id=request_id
-            )
-        
-        logger.info(f"Processing method: {method}, id: {request_id}")
-        
-        # Método: initialize
-        if method == "initialize":
-            client_version = params.get("protocolVersion", MCP_PROTOCOL_VERSION)
-            
-            # Validar versión del protocolo
-            if client_version not in COMPATIBLE_MCP_VERSIONS:
-                logger.warning(f"Incompatible protocol version: {client_version}")
-                return JSONRPCResponse(
-                    error=JSONRPCError(
-                        code=-32600,
-                        message=f"Unsupported protocol version: {client_version}",
-                        data={"supportedVersions": COMPATIBLE_MCP_VERSIONS}
-                    ),
-                    id=request_id
-                )
-            
-            logger.info(f"Initialize successful with version {client_version}")
-            return JSONRPCResponse(
-                result={
-                    "protocolVersion": MCP_PROTOCOL_VERSION,
-                    "serverInfo": {
-                        "name": "miApp MCP Server",
-                        "version": "1.0.0"
-                    },
-                    "capabilities": {
-                        "tools": {
-                            "listChanged": False
-                        }
-                    }
-                },
-                id=request_id
-            )
-        
-        # Método: notifications/initialized
-        elif method == "notifications/initialized":
-            logger.info("Handling notifications/initialized - returning 202 Accepted")
-            return Response(status_code=202)
-        
-        # Método: tools/list
-        elif method == "tools/list":
-            tools = [
-                {
-                    "name": "get_user_demo",
-                    "description": "Obtiene datos de demostración de un usuario. Retorna información de perfil con email benito@gmail.com, nombre, estadísticas y preferencias.",
-                    "inputSchema": {
-                        "type": "object",
-                        "properties": {
-                            "include_details": {
-                                "type": "boolean",
-                                "description": "Si es true, incluye detalles adicionales del usuario como estadísticas, preferencias y fechas",
-                                "default": True
-                            }
-                        }
-                    }
-                }
-            ]
-            
-            logger.info(f"Returning {len(tools)} tools")
-            return JSONRPCResponse(
-                result={"tools": tools},
-                id=request_id
-            )
-        
-        # Método: tools/call
-        elif method == "tools/call":
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
-            
-            logger.info(f"Calling tool: {tool_name} with args: {arguments}")
-            
-            if tool_name == "get_user_demo":
-                include_details = arguments.get("include_details", True)
-                
-                user_data = {
-                    "email": "benito@gmail.com",
-                    "name": "Benito Martínez",
-                    "username": "benito_m",
-                    "id": "usr_12345",
-                    "status": "active"
-                }
-                
-                if include_details:
-                    user_data.update({
-                        "created_at": "2024-01-15T10:30:00Z",
-                        "last_login": "2025-12-23T08:15:30Z",
-                        "role": "premium_user",
-                        "preferences": {
-                            "language": "es",
-                            "notifications": True,
-                            "theme": "dark"
-                        },
-                        "stats": {
-                            "total_games": 42,
-                            "high_score": 1250,
-                            "achievements": 15
-                        }
-                    })
-                
-                logger.info("Tool execution successful")
-                return JSONRPCResponse(
-                    result={
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": json.dumps(user_data, indent=2, ensure_ascii=False)
-                            }
-                        ]
-                    },
-                    id=request_id
-                )
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families:
+            family.render(lines)
+        for name, help_text, callback in self._gauge_callbacks:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                values = callback()
+            except Exception as e:
+                logger.debug("Metrics callback %s failed: %s", name, e)
+                continue
+            if isinstance(values, dict):
+                for labels, value in values.items():
+                    lines.append(f"{name}{{{labels}}} {value}")
             else:
-                logger.warning(f"Unknown tool: {tool_name}")
-                return JSONRPCResponse(
-                    error=JSONRPCError(
-                        code=-32602,
-                        message=f"Unknown tool: {tool_name}"
-                    ),
-                    id=request_id
-                )
-        
-        # Método desconocido
-        else:
-            logger.warning(f"Unknown method: {method}")
-            return JSONRPCResponse(
-                error=JSONRPCError(
-                    code=-32601,
-                    message=f"Method not found: {method}"
-                ),
-                id=request_id
-            )
-            
-    except json.JSONDecodeError:
-        logger.error("JSON parse error")
-        return JSONRPCResponse(
-            error=JSONRPCError(
-                code=-32700,
-                message="Parse error: Invalid JSON"
-            ),
-            id=None
-        )
-    except Exception as e:
-        logger.error(f"Internal error: {str(e)}", exc_info=True)
-        return JSONRPCResponse(
-            error=JSONRPCError(
-                code=-32603,
-                message="Internal error",
-                data=str(e)
-            ),
-            id=req_body.get("id") if req_body else None
-        )
+                lines.append(f"{name} {values}")
+        return "\n".join(lines) + "\n"
 
 
-@app.get("/")
-async def serve_spa():
-    """Servir el frontend Angular"""
-    index_file = WWW_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(str(index_file))
-    return {"message": "Frontend no encontrado. Asegúrate de compilar la aplicación Angular."}
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Peticiones HTTP por método, ruta y código de estado", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route")
+)
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Peticiones HTTP en curso")
+MCP_REQUESTS = metrics.counter(
+    "mcp_requests_total", "Métodos y tools MCP ejecutados por resultado", ("method", "outcome")
+)
+MCP_REQUEST_DURATION = metrics.histogram(
+    "mcp_request_duration_seconds", "Duración de los métodos y tools MCP", ("method",)
+)
+DB_CONNECT_DURATION = metrics.histogram("db_connect_duration_seconds", "Tiempo de apertura de conexiones a la BD")
+DB_CONNECT_ERRORS = metrics.counter("db_connect_errors_total", "Conexiones a la BD fallidas")
+DB_QUERY_DURATION = metrics.histogram(
+    "db_query_duration_seconds", "Tiempo de ejecución de sentencias SQL", ("query",)
+)
+DB_QUERY_ERRORS = metrics.counter("db_query_errors_total", "Sentencias SQL fallidas", ("query",))
+DB_ROWS_RETURNED = metrics.histogram(
+    "db_rows_returned", "Filas leídas por consulta", ("query",), buckets=ROW_BUCKETS
+)
 
+_QUERY_VERB_RE = re.compile(r"\b(SELECT|INSERT|UPDATE|DELETE|MERGE|CREATE|DROP|EXEC)\b", re.IGNORECASE)
+_QUERY_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|EXEC)\s+([#\w.\[\]]+)", re.IGNORECASE)
+_query_labels: Dict[str, str] = {}
 
-@app.get("/health")
-async def health_check():
+
+def query_label(sql: str) -> str:
     """
-    Endpoint de health check que verifica:
-    - Estado de la aplicación
-    - Conexión a la base de datos
+    Etiqueta corta y estable para una sentencia SQL: verbo, tabla y un hash
+    del texto (ej. "select SnakeScores a1b2c3"). Las sentencias de la app
+    son fijas, así que la caché no crece con los parámetros.
     """
-    # Verificar conexión a la base de datos
-    db_success, db_message = test_database_connection()
-    
-    health_status = {
-        "status": "healthy" if db_success else "unhealthy",
-        "timestamp": None,
-        "checks": {
-            "application": {
-                "status": "up",
-                "message": "Application is running"
-            },
-            "database": {
-                "status": "up" if db_success else "down",
-                "message": db_message,
-                "server": HOST_DB,
-                "database": DATABASE_NAME
-            }
-        }
-    }
-    
-    # Agregar timestamp
-    from datetime import datetime
-    health_status["timestamp"] = datetime.utcnow().isoformat() + "Z"
-    
-    if not db_success:
-        return JSONResponse(
-            status_code=503,
-            content=health_status
-        )
-    
-    return health_status
+    label = _query_labels.get(sql)
+    if label is None:
+        verb = _QUERY_VERB_RE.search(sql)
+        table = _QUERY_TABLE_RE.search(sql)
+        label = " ".join(filter(None, (
+            verb.group(1).lower() if verb else "sql",
+            table.group(1).replace("dbo.", "").strip("[]") if table else None,
+            hashlib.blake2b(sql.encode("utf-8"), digest_size=3).hexdigest()
+        )))
+        if len(_query_labels) < 1000:
+            _query_labels[sql] = label
+    return label
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: duración, código de estado y peticiones en curso por
+    ruta (la plantilla de la ruta, no la URL, para acotar las series).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route_path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route_path, status_code).inc()
 
 
 # ============================================================
-# Endpoints para Snake Scores
+# Trazas por petición y log de peticiones lentas
 # ============================================================
 
-@app.post("/api/snake-scores", response_model=dict)
-async def create_snake_score(score_data: SnakeScoreCreate):
+class RequestTrace:
     """
-    Guardar un nuevo score del juego de la serpiente
+    Spans de una petición (db.queue, db.acquire, db.connect, db.execute,
+    db.fetch, serialize...) con su inicio relativo y duración en ms.
+    Se añaden desde el event loop y desde los hilos del executor de BD
+    (list.append es atómico).
     """
-    try:
-        conn_string = get_db_connection_string()
-        conn = pyodbc.connect(conn_string)
-        cursor = conn.cursor()
-        
-        # Insertar el score en la base de datos y obtener el ID
-        query = """
-            INSERT INTO dbo.SnakeScores (PlayerName, Score, GameDate)
-            OUTPUT INSERTED.Id
-            VALUES (?, ?, GETDATE());
-        """
-        
-        cursor.execute(query, score_data.PlayerName, score_data.Score)
-        result = cursor.fetchone()
-        new_id = result[0] if result else None
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
-        
+    __slots__ = ("trace_id", "method", "path", "started", "started_at", "spans", "dropped")
+
+    def __init__(self, method: str, path: str):
+        self.trace_id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+
+    def add_span(self, name: str, started: float, ended: float, **attrs: Any) -> Optional[Dict[str, Any]]:
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = {
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round((ended - started) * 1000, 3),
+            **attrs
+        }
+        self.spans.append(span)
+        return span
+
+    def to_dict(self, route: str, status_code: int, duration_ms: float) -> Dict[str, Any]:
+        spans = []
+        for span in self.spans:
+            if "sql" in span:
+                span = {**span, "sql": " ".join(span["sql"].split())[:2000]}
+            spans.append(span)
         return {
-            "success": True,
-            "message": "Score guardado exitosamente",
-            "id": int(new_id) if new_id else None
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "method": self.method,
+            "path": self.path,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "spans": spans,
+            "dropped_spans": self.dropped
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al guardar el score: {str(e)}")
 
 
-@app.get("/api/snake-scores/top/{limit}", response_model=List[SnakeScoreResponse])
-async def get_top_scores(limit: int = 10):
-    """
-    Obtener los mejores scores (top N)
-    """
+# Traza de la petición en curso (None si el tracing está desactivado)
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def trace_span(name: str, **attrs: Any):
+    """Medir un bloque como span de la traza actual (no hace nada sin traza)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
     try:
-        conn_string = get_db_connection_string()
-        conn = pyodbc.connect(conn_string)
-        cursor = conn.cursor()
-        
-        # Obtener los mejores scores
-        query = """
-            SELECT TOP (?) 
-                Id,
-                PlayerName,
-                Score,
-                FORMAT(GameDate, 'yyyy-MM-dd HH:mm:ss') as GameDate,
-                FORMAT(CreatedAt, 'yyyy-MM-dd HH:mm:ss') as CreatedAt
-            FROM dbo.SnakeScores
-            ORDER BY Score DESC, GameDate DESC
-        """
-        
-        cursor.execute(query, limit)
-        rows = cursor.fetchall()
-        
-        scores = []
-        for row in rows:
-            scores.append({
-                "Id": row.Id,
-                "PlayerName": row.PlayerName,
-                "Score": row.Score,
-                "GameDate": row.GameDate,
-                "CreatedAt": row.CreatedAt
-            })
-        
-        cursor.close()
-        conn.close()
-        
-        return scores
-        
+        yield
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener los scores: {str(e)}")
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        trace.add_span(name, started, time.perf_counter(), **attrs)
 
 
-@app.get("/api/snake-scores/player/{player_name}", response_model=List[SnakeScoreResponse])
-async def get_player_scores(player_name: str):
+def params_shape(params: Any) -> List[str]:
+    """Tipos de los parámetros de una consulta (sin sus valores)"""
+    return [type(param).__name__ for param in params]
+
+
+def sql_messages(cursor) -> List[str]:
+    """Mensajes informativos del servidor (salida de SET STATISTICS TIME/IO)"""
+    messages = getattr(cursor, "messages", None) or []
+    return [message[1] if isinstance(message, tuple) else str(message) for message in messages]
+
+
+SLOW_REQUESTS = metrics.counter("http_slow_requests_total", "Peticiones más lentas que TRACE_SLOW_REQUEST_MS", ("route",))
+
+
+def _build_trace_logger() -> Optional[logging.Logger]:
+    """Logger que escribe trazas JSONL en TRACE_EXPORT_PATH desde un hilo aparte"""
+    if not TRACE_EXPORT_PATH:
+        return None
+    file_handler = logging.FileHandler(TRACE_EXPORT_PATH, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(trace_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    trace_logger = logging.getLogger(f"{__name__}.traces")
+    trace_logger.propagate = False
+    trace_logger.handlers = [_DeferredQueueHandler(trace_queue)]
+    trace_logger.setLevel(logging.INFO)
+    return trace_logger
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que abre una RequestTrace por petición. Al terminar,
+    las peticiones más lentas que TRACE_SLOW_REQUEST_MS se loguean con sus
+    spans (SQL y tipos de parámetros incluidos) y se exportan a JSONL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.trace_logger = _build_trace_logger()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_trace.reset(token)
+            duration_ms = (time.perf_counter() - trace.started) * 1000
+            route_path = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.finish(trace, route_path, status_code, duration_ms)
+
+    def finish(self, trace: RequestTrace, route_path: str, status_code: int, duration_ms: float):
+        slow = duration_ms >= TRACE_SLOW_REQUEST_MS
+        if not slow and not (TRACE_EXPORT_ALL and self.trace_logger is not None):
+            return
+        
+        data = encode_json(trace.to_dict(route_path, status_code, duration_ms)).decode("utf-8")
+        if slow:
+            SLOW_REQUESTS.labels(route_path).inc()
+            logger.warning(
+                "Slow request %s %s status=%d duration_ms=%.1f trace=%s",
+                trace.method, trace.path, status_code, duration_ms, data
+            )
+        if self.trace_logger is not None:
+            self.trace_logger.info(data)
+
+
+# ============================================================
+# Pool de conexiones a la base de datos
+# ============================================================
+
+class PooledConnection:
+    """Conexión pyodbc gestionada por el pool, con caché de sentencias preparadas"""
+
+    def __init__(self, conn, max_statements: int):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.max_statements = max_statements
+        self.statement_hits = 0
+        self.statistics_enabled = False
+        self._statements: "OrderedDict[str, Any]" = OrderedDict()
+        # Cursores ejecutados cuyos resultados aún pueden estar pendientes
+        self._pending: set = set()
+        # Spans lentos que esperan la salida de STATISTICS, por cursor
+        self._statistics_spans: Dict[Any, Dict[str, Any]] = {}
+
+    def cursor(self, sql: str):
+        """
+        Devolver el cursor reservado para una sentencia SQL.
+        pyodbc reutiliza la sentencia preparada cuando el mismo SQL
+        se ejecuta de nuevo sobre el mismo cursor.
+        """
+        cursor = self._statements.get(sql)
+        if cursor is not None:
+            self._statements.move_to_end(sql)
+            self.statement_hits += 1
+            return cursor
+
+        cursor = self.conn.cursor()
+        self._statements[sql] = cursor
+        if len(self._statements) > self.max_statements:
+            oldest_sql, oldest = self._statements.popitem(last=False)
+            self._pending.discard(oldest_sql)
+            self._statistics_spans.pop(oldest, None)
+            try:
+                oldest.close()
+            except Exception:
+                pass
+        return cursor
+
+    def _drain_cursor(self, cursor):
+        """
+        Consumir los result sets pendientes (filas sin leer, conteos de filas).
+        SQL Server envía la salida de STATISTICS IO/TIME detrás de cada result
+        set: se recoge aquí, después de leer las filas, para el span pendiente.
+        """
+        span = self._statistics_spans.pop(cursor, None)
+        try:
+            cursor.fetchall()
+        except Exception:
+            pass
+        try:
+            # pyodbc actualiza `messages` en execute y en cada nextset()
+            while cursor.nextset():
+                try:
+                    cursor.fetchall()
+                except Exception:
+                    pass
+                if span is not None:
+                    span["statistics"].extend(sql_messages(cursor))
+        except Exception:
+            pass
+
+    def drain(self):
+        """
+        Vaciar los cursores cacheados con resultados sin consumir antes de
+        devolver la conexión al pool: un result set abierto deja la conexión
+        ocupada para la siguiente sentencia.
+        """
+        for sql in self._pending:
+            cursor = self._statements.get(sql)
+            if cursor is not None:
+                self._drain_cursor(cursor)
+        self._pending.clear()
+
+    def _enable_statistics(self):
+        """SET STATISTICS TIME/IO una vez por conexión (solo con tracing activo)"""
+        if not self.statistics_enabled:
+            self.conn.execute("SET STATISTICS TIME ON; SET STATISTICS IO ON;")
+            self.statistics_enabled = True
+
+    def _trace_statement(self, trace: RequestTrace, name: str, sql: str, cursor,
+                         started: float, ended: float, **attrs: Any):
+        span = trace.add_span(name, started, ended, sql=sql, **attrs)
+        if span is not None and TRACE_SQL_STATISTICS and span["duration_ms"] >= TRACE_SLOW_QUERY_MS:
+            # Tras execute solo hay los tiempos de compilación; el resto llega al leer las filas
+            span["statistics"] = sql_messages(cursor)
+            self._statistics_spans[cursor] = span
+
+    def execute(self, sql: str, *params, cached: bool = True):
+        """
+        Ejecutar SQL sobre el cursor cacheado y devolverlo para leer resultados.
+        `cached=False` usa un cursor nuevo que el llamador debe cerrar
+        (lecturas largas que pueden abandonarse con filas pendientes).
+        """
+        if cached:
+            cursor = self.cursor(sql)
+            self._pending.add(sql)
+        else:
+            cursor = self.conn.cursor()
+        trace = _current_trace.get()
+        if trace is not None and TRACE_SQL_STATISTICS:
+            self._enable_statistics()
+        started = time.perf_counter()
+        try:
+            cursor.execute(sql, *params)
+        except Exception:
+            DB_QUERY_ERRORS.labels(query_label(sql)).inc()
+            raise
+        ended = time.perf_counter()
+        DB_QUERY_DURATION.labels(query_label(sql)).observe(ended - started)
+        if trace is not None:
+            self._trace_statement(trace, "db.execute", sql, cursor, started, ended, params=params_shape(params))
+        return cursor
+
+    def executemany(self, sql: str, params_seq, fast: bool = True):
+        """Ejecutar SQL para muchas filas; `fast_executemany` envía los parámetros en bloque"""
+        cursor = self.cursor(sql)
+        cursor.fast_executemany = fast
+        started = time.perf_counter()
+        self._pending.add(sql)
+        try:
+            cursor.executemany(sql, params_seq)
+        except Exception:
+            DB_QUERY_ERRORS.labels(query_label(sql)).inc()
+            raise
+        ended = time.perf_counter()
+        DB_QUERY_DURATION.labels(query_label(sql)).observe(ended - started)
+        trace = _current_trace.get()
+        if trace is not None:
+            self._trace_statement(
+                trace, "db.executemany", sql, cursor, started, ended,
+                rows=len(params_seq), params=params_shape(params_seq[0]) if params_seq else []
+            )
+        return cursor
+
+    def fetchall(self, sql: str, *params) -> List[Any]:
+        """Ejecutar una consulta y leer todas sus filas (cuenta las filas en las métricas)"""
+        cursor = self.execute(sql, *params)
+        started = time.perf_counter()
+        rows = cursor.fetchall()
+        self._drain_cursor(cursor)
+        self._pending.discard(sql)
+        DB_ROWS_RETURNED.labels(query_label(sql)).observe(len(rows))
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span("db.fetch", started, time.perf_counter(), rows=len(rows))
+        return rows
+
+    def fetchmany(self, cursor, size: int) -> List[Any]:
+        """Leer el siguiente bloque de filas de un cursor ya ejecutado"""
+        started = time.perf_counter()
+        rows = cursor.fetchmany(size)
+        if not rows:
+            # Fin del resultado: leer lo que quede (incluida la salida de STATISTICS)
+            self._drain_cursor(cursor)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span("db.fetch", started, time.perf_counter(), rows=len(rows))
+        return rows
+
+    def fetchone(self, sql: str, *params):
+        """Leer la primera fila y vaciar el resto de resultados del cursor"""
+        cursor = self.execute(sql, *params)
+        started = time.perf_counter()
+        row = cursor.fetchone()
+        self._drain_cursor(cursor)
+        self._pending.discard(sql)
+        DB_ROWS_RETURNED.labels(query_label(sql)).observe(0 if row is None else 1)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span("db.fetch", started, time.perf_counter(), rows=0 if row is None else 1)
+        return row
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        """Cerrar cursores y conexión ignorando errores (la conexión puede estar rota)"""
+        for cursor in self._statements.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._statements.clear()
+        self._pending.clear()
+        self._statistics_spans.clear()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class DBConnectionPool:
+    """
+    Pool de conexiones pyodbc thread-safe.
+    - Tamaño mínimo/máximo configurable
+    - Reciclado de conexiones inactivas más de `idle_timeout` segundos
+    - Validación (SELECT 1) al entregar conexiones inactivas más de `validate_after` segundos
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+        idle_timeout: float = DB_POOL_IDLE_TIMEOUT,
+        acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT,
+        validate_after: float = DB_POOL_VALIDATE_AFTER,
+        max_statements: int = DB_POOL_MAX_STATEMENTS,
+    ):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.validate_after = validate_after
+        self.max_statements = max_statements
+        self._idle: deque = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "recycled": 0,
+            "validation_failures": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "prepared_statement_hits": 0,
+        }
+
+    def _new_connection(self) -> PooledConnection:
+        pooled = PooledConnection(self._connect(), self.max_statements)
+        with self._cond:
+            self._stats["created"] += 1
+        return pooled
+
+    def _is_healthy(self, pooled: PooledConnection) -> bool:
+        if time.monotonic() - pooled.last_used < self.validate_after:
+            return True
+        try:
+            pooled.fetchone("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def _forget(self, pooled: PooledConnection, counter: str):
+        """Sacar una conexión del pool (ya no está en `_idle`) y cerrarla"""
+        with self._cond:
+            self._size -= 1
+            self._stats[counter] += 1
+            self._collect_statement_hits(pooled)
+            self._cond.notify()
+        pooled.close()
+
+    def _collect_statement_hits(self, pooled: PooledConnection):
+        self._stats["prepared_statement_hits"] += pooled.statement_hits
+        pooled.statement_hits = 0
+
+    def fill(self):
+        """Abrir conexiones hasta alcanzar el tamaño mínimo"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self.release(pooled)
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Obtener una conexión del pool, creando una nueva si hay capacidad"""
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        while True:
+            pooled = None
+            expired = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if now - candidate.last_used > self.idle_timeout:
+                            expired.append(candidate)
+                            self._size -= 1
+                            self._stats["recycled"] += 1
+                            continue
+                        pooled = candidate
+                        break
+                    if pooled is not None:
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise TimeoutError(
+                            f"Timed out waiting for a database connection ({self.max_size} in use)"
+                        )
+                    self._cond.wait(remaining)
+
+            for conn in expired:
+                conn.close()
+
+            if pooled is None:
+                # Hay capacidad: abrir la conexión fuera del lock
+                try:
+                    return self._new_connection()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(pooled):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return pooled
+
+            logger.warning("Discarding pooled connection that failed validation")
+            self._forget(pooled, "validation_failures")
+
+    def release(self, pooled: PooledConnection, discard: bool = False):
+        """Devolver una conexión al pool o descartarla si quedó inutilizable"""
+        if discard or self._closed:
+            self._forget(pooled, "discarded")
+            return
+        pooled.drain()
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._collect_statement_hits(pooled)
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager: entrega una conexión y la devuelve al terminar"""
+        with trace_span("db.acquire"):
+            pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception:
+            discard = False
+            try:
+                pooled.rollback()
+            except Exception:
+                discard = True
+            self.release(pooled, discard=discard)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        """Cerrar todas las conexiones inactivas y rechazar nuevas peticiones"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            pooled.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas del pool"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+
+def _open_db_connection():
+    """Abrir una conexión física a la base de datos"""
+    started = time.perf_counter()
+    with trace_span("db.connect"):
+        try:
+            conn = pyodbc.connect(get_db_connection_string())
+        except Exception:
+            DB_CONNECT_ERRORS.labels().inc()
+            raise
+    DB_CONNECT_DURATION.labels().observe(time.perf_counter() - started)
+    return conn
+
+
+db_pool = DBConnectionPool(_open_db_connection)
+
+
+# ============================================================
+# Executor de base de datos
+# ============================================================
+
+class DBExecutorSaturated(Exception):
+    """La cola de espera del executor de base de datos está llena"""
+
+
+class DBExecutor:
+    """
+    Ejecuta las llamadas bloqueantes de pyodbc en un pool de hilos dedicado
+    para no bloquear el event loop.
+    - Número de hilos configurable
+    - Cola de espera acotada: si se llena, se rechaza con DBExecutorSaturated
+    - Timeout por llamada (TimeoutError)
+    - Métricas de profundidad de cola y tiempo de espera
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DB_EXECUTOR_WORKERS,
+        max_queue: int = DB_EXECUTOR_QUEUE_SIZE,
+        default_timeout: float = DB_CALL_TIMEOUT,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.default_timeout = default_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "started": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="db-executor"
+                )
+            return self._executor
+
+    async def run(self, func, *args, timeout: Optional[float] = None):
+        """Ejecutar `func(*args)` en el pool de hilos y esperar su resultado"""
+        executor = self._get_executor()
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise DBExecutorSaturated(
+                    f"Database executor saturated ({self._queued} calls waiting)"
+                )
+            self._queued += 1
+            self._stats["submitted"] += 1
+        submitted_at = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            wait_time = started - submitted_at
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.add_span("db.queue", submitted_at, started)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._stats["started"] += 1
+                self._stats["wait_time_total"] += wait_time
+                if wait_time > self._stats["wait_time_max"]:
+                    self._stats["wait_time_max"] = wait_time
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        # Los hilos no heredan contextvars: con traza, la llamada corre en una copia del contexto
+        if _current_trace.get() is not None:
+            future = executor.submit(contextvars.copy_context().run, call)
+        else:
+            future = executor.submit(call)
+        # Una llamada cancelada antes de empezar (timeout, cliente desconectado,
+        # shutdown) nunca ejecuta call(): la cola se descuenta aquí
+        future.add_done_callback(self._forget_cancelled)
+        if timeout is None:
+            timeout = self.default_timeout
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout if timeout and timeout > 0 else None
+            )
+        except TimeoutError:
+            # Si no llegó a empezar, sale de la cola; si ya corre, el hilo termina por su cuenta
+            future.cancel()
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        with self._lock:
+            self._stats["completed"] += 1
+        return result
+
+    def _forget_cancelled(self, future):
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def shutdown(self):
+        """Detener el pool de hilos descartando las llamadas pendientes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del executor"""
+        with self._lock:
+            started = self._stats["started"]
+            avg_wait = self._stats["wait_time_total"] / started if started > 0 else 0.0
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "submitted": self._stats["submitted"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "rejected": self._stats["rejected"],
+                "timeouts": self._stats["timeouts"],
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self._stats["wait_time_max"] * 1000, 3),
+            }
+
+
+db_executor = DBExecutor()
+
+
+def test_database_connection() -> Tuple[bool, str]:
+    """Probar la conexión a la base de datos (SELECT 1 con una conexión del pool)"""
+    try:
+        with db_pool.connection() as db:
+            db.fetchone("SELECT 1")
+        return True, "Database connection successful"
+    except Exception as e:
+        return False, str(e)
+
+
+class DatabaseHealthProbe:
+    """
+    Comprueba la BD en segundo plano cada `interval` segundos y guarda el
+    último resultado, para que los health checks no abran conexiones.
+    El SELECT 1 pasa por el pool (test_database_connection) pero corre en
+    un hilo propio, fuera del executor de BD. Un timeout (executor o pool
+    agotados, BD lenta) marca la BD como ocupada (`busy`) pero no como
+    caída; solo un error de conexión o de ejecución la marca como caída.
+    """
+
+    def __init__(
+        self,
+        interval: float = HEALTH_PROBE_INTERVAL,
+        timeout: float = HEALTH_PROBE_TIMEOUT,
+        max_age: float = HEALTH_PROBE_MAX_AGE,
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = max_age
+        self.success = False
+        self.message = "Database check pending"
+        self.checked_at: Optional[datetime] = None
+        self.duration_ms: Optional[float] = None
+        self.busy = False
+        self._checked_monotonic: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    def record(self, success: bool, message: str, duration: float = 0.0):
+        self.success = success
+        self.message = message
+        self.checked_at = datetime.utcnow()
+        self.duration_ms = round(duration * 1000, 3)
+        self._checked_monotonic = time.monotonic()
+
+    async def check(self):
+        started = time.perf_counter()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-health")
+        # Si el SELECT 1 anterior sigue esperando (p. ej. por una conexión del
+        # pool) no se encola otro detrás: se sigue esperando al mismo
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.get_running_loop().run_in_executor(
+                self._executor, test_database_connection
+            )
+        try:
+            success, message = await asyncio.wait_for(asyncio.shield(self._inflight), self.timeout)
+        except asyncio.TimeoutError:
+            # Lenta no es caída: se conserva el último resultado
+            self.busy = True
+            self.record(self.success, "Database check timed out (busy)", time.perf_counter() - started)
+            return
+        self.busy = False
+        self.record(success, message, time.perf_counter() - started)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self.record(False, str(e))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="database_health_probe")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._inflight = None
+
+    @property
+    def age(self) -> Optional[float]:
+        if self._checked_monotonic is None:
+            return None
+        return time.monotonic() - self._checked_monotonic
+
+    @property
+    def stale(self) -> bool:
+        age = self.age
+        return age is None or age > self.max_age
+
+    @property
+    def ready(self) -> bool:
+        return self.success and not self.stale
+
+    def status(self) -> Dict[str, Any]:
+        age = self.age
+        return {
+            "status": "up" if self.ready else "down",
+            "message": self.message if not (self.success and self.stale) else "Database check is stale",
+            "server": HOST_DB,
+            "database": DATABASE_NAME,
+            "checked_at": self.checked_at.isoformat() + "Z" if self.checked_at else None,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "stale": self.stale,
+            "busy": self.busy,
+            "duration_ms": self.duration_ms
+        }
+
+
+db_health = DatabaseHealthProbe()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Gestionar el ciclo de vida de la aplicación"""
+    # Startup
+    print("Starting up FastAPI application...")
+    if STATIC_MANIFEST and WWW_DIR.exists():
+        # Lectura y compresión de www/ fuera del event loop, una sola vez
+        await asyncio.get_running_loop().run_in_executor(None, static_assets.load)
+        print(f"✓ Static manifest: {static_assets.stats()['files']} files")
+    
+    await db_health.check()
+    success, message = db_health.success, db_health.message
+    db_health.start()
+    if success:
+        print(f"✓ {message}")
+    else:
+        print(f"✗ Database connection failed: {message}")
+    
+    # Precalentar el pool hasta el tamaño mínimo
+    if success:
+        try:
+            await db_executor.run(db_pool.fill)
+        except Exception as e:
+            logger.warning(f"Could not warm up connection pool: {e}")
+    
+    # Cargar el ranking de jugadores sin bloquear el arranque
+    if success:
+        _refresh_player_ranking_in_background()
+    
+    if SCORE_WRITE_BEHIND:
+        score_writer.start()
+        print("✓ Score write-behind enabled")
+    
+    # La réplica se carga en segundo plano; hasta entonces se lee de la BD
+    if READ_REPLICA_ENABLED:
+        score_replica.start()
+        print("✓ Read replica enabled")
+    
+    yield
+    
+    # Shutdown
+    print("Shutting down FastAPI application...")
+    mcp_server_events.close()
+    await db_health.stop()
+    await score_writer.stop()
+    await score_replica.stop()
+    db_executor.shutdown()
+    db_pool.close()
+
+
+# Crear la aplicación FastAPI
+app = FastAPI(
+    title="miApp API",
+    description="API con FastAPI y conexión a Azure SQL Database",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Configurar CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Permitir todos los orígenes en producción
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Mcp-Session-Id", "ETag"],
+)
+
+# Métricas por ruta (el último middleware añadido es el más externo)
+if TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Montar archivos estáticos del frontend Angular
+# (con STATIC_MANIFEST, /assets se sirve desde el manifest en la ruta catch-all)
+if WWW_DIR.exists() and not STATIC_MANIFEST:
+    app.mount("/assets", StaticFiles(directory=str(WWW_DIR / "assets")), name="assets")
+
+
+# ============================================================
+# Control de admisión (load shedding)
+# ============================================================
+
+# Límites por defecto: (peticiones concurrentes, peticiones en espera)
+DEFAULT_ADMISSION_LIMITS = {
+    # Con write-behind cada create espera a su lote: el límite debe dejar
+    # llenar un lote completo (la BD sigue viendo un único INSERT por lote)
+    "create": (
+        (max(8, SCORE_WRITE_BEHIND_BATCH_SIZE), max(32, 2 * SCORE_WRITE_BEHIND_BATCH_SIZE))
+        if SCORE_WRITE_BEHIND else (8, 32)
+    ),
+    "batch": (2, 4),
+    "top": (8, 32),
+    "player": (8, 32),
+    "rank": (4, 16),
+    "leaderboard": (4, 16),
+    "export": (2, 2),
+    "mcp": (8, 32),
+}
+
+RETRY_AFTER_HEADERS = {"Retry-After": str(ADMISSION_RETRY_AFTER)}
+
+
+class AdmissionRejected(Exception):
+    """Petición rechazada por el control de admisión (se responde 503)"""
+
+    def __init__(self, route: str, reason: str):
+        super().__init__(f"Service overloaded ({route}: {reason})")
+        self.route = route
+        self.reason = reason
+
+
+class RouteLimiter:
+    """
+    Semáforo con cola FIFO acotada para una ruta. Al liberar un hueco se
+    pasa directamente al primero en espera, así que no hay carreras entre
+    los que esperan y los que llegan.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def acquire(self, timeout: float):
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, "queue full")
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise AdmissionRejected(self.name, "queue timeout")
+        except asyncio.CancelledError:
+            # El hueco ya se había pasado a esta petición: se devuelve
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+        
+        wait_time = time.perf_counter() - started
+        self.admitted += 1
+        self.wait_time_total += wait_time
+        if wait_time > self.wait_time_max:
+            self.wait_time_max = wait_time
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        waited = self.admitted
+        return {
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_time_total / waited * 1000, 3) if waited else 0.0,
+            "max_wait_ms": round(self.wait_time_max * 1000, 3)
+        }
+
+
+class AdmissionTicket:
+    """Hueco concedido; se libera una sola vez (también si se pierde la referencia)"""
+    __slots__ = ("_limiter",)
+
+    def __init__(self, limiter: Optional[RouteLimiter]):
+        self._limiter = limiter
+
+    def release(self):
+        limiter, self._limiter = self._limiter, None
+        if limiter is not None:
+            limiter.release()
+
+    def __del__(self):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Control de admisión para las rutas que usan la BD:
+    - Cada ruta tiene su límite de concurrencia y una cola de espera acotada
+    - Cola llena, espera mayor que `queue_timeout` o BD caída -> 503 con Retry-After
+    - Las lecturas que se pueden servir desde caché no pasan por aquí
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]], queue_timeout: float, enabled: bool = True):
+        self.enabled = enabled
+        self.queue_timeout = queue_timeout
+        self.shed_db_down = 0
+        self._limiters = {
+            name: RouteLimiter(name, concurrency, queue)
+            for name, (concurrency, queue) in limits.items()
+        }
+
+    @staticmethod
+    def parse_limits(spec: str, defaults: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[int, int]]:
+        """Límites por defecto sobrescritos con "ruta=concurrencia:cola,..." """
+        limits = dict(defaults)
+        for item in spec.split(","):
+            if not item.strip():
+                continue
+            try:
+                name, values = item.split("=", 1)
+                concurrency, queue_size = values.split(":", 1)
+                limits[name.strip()] = (int(concurrency), int(queue_size))
+            except ValueError:
+                logger.warning(f"Invalid ADMISSION_LIMITS entry: {item!r}")
+        return limits
+
+    async def acquire(self, route: str) -> AdmissionTicket:
+        if not self.enabled:
+            return AdmissionTicket(None)
+        # Solo un error real de conexión del probe cuenta como caída (no la saturación)
+        if ADMISSION_SHED_WHEN_DB_DOWN and not db_health.success:
+            self.shed_db_down += 1
+            raise AdmissionRejected(route, "database unavailable")
+        limiter = self._limiters[route]
+        await limiter.acquire(self.queue_timeout)
+        return AdmissionTicket(limiter)
+
+    @asynccontextmanager
+    async def slot(self, route: str, bypass: bool = False):
+        """`async with admission.slot("ruta"):` alrededor del trabajo contra la BD"""
+        if bypass:
+            yield
+            return
+        ticket = await self.acquire(route)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    async def release_after(self, ticket: AdmissionTicket, iterator):
+        """Mantener el hueco mientras dura una respuesta en streaming"""
+        try:
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queue_timeout_seconds": self.queue_timeout,
+            "shed_db_down": self.shed_db_down,
+            "routes": {name: limiter.stats() for name, limiter in self._limiters.items()}
+        }
+
+
+admission = AdmissionController(
+    AdmissionController.parse_limits(ADMISSION_LIMITS, DEFAULT_ADMISSION_LIMITS),
+    ADMISSION_QUEUE_TIMEOUT,
+    enabled=ADMISSION_CONTROL
+)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=RETRY_AFTER_HEADERS)
+
+
+# ============================================================
+# Serialización JSON rápida
+# ============================================================
+
+def encode_json(content: Any) -> bytes:
+    """Codificar a JSON con orjson si está disponible (salida compacta UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON para datos que ya vienen con la forma final desde la BD:
+    FastAPI no vuelve a validarlos contra response_model.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if _current_trace.get() is None:
+            return encode_json(content)
+        started = time.perf_counter()
+        body = encode_json(content)
+        _current_trace.get().add_span("serialize", started, time.perf_counter(), bytes=len(body))
+        return body
+
+
+# ============================================================
+# Modelos Pydantic para Snake Scores
+# ============================================================
+
+class SnakeScoreCreate(BaseModel):
+    # La columna es NVARCHAR(100): un nombre más largo haría fallar el INSERT
+    PlayerName: str = Field(min_length=1, max_length=100)
+    Score: int = Field(ge=0, le=SCORE_MAX_VALUE)
+
+class SnakeScoreResponse(BaseModel):
+    Id: int
+    PlayerName: str
+    Score: int
+    GameDate: str
+    CreatedAt: str
+
+
+# ============================================================
+# Modelos Pydantic para MCP Tools (JSON-RPC 2.0)
+# ============================================================
+
+class JSONRPCRequest(BaseModel):
+    jsonrpc: str = "2.0"
+    method: str
+    params: Optional[Dict[str, Any]] = None
+    id: Optional[Union[str, int]] = None
+
+
+class JSONRPCError(BaseModel):
+    code: int
+    message: str
+    data: Optional[Any] = None
+
+
+class JSONRPCResponse(BaseModel):
+    jsonrpc: str = "2.0"
+    result: Optional[Any] = None
+    error: Optional[JSONRPCError] = None
+    id: Optional[Union[str, int]] = None
+
+
+class MCPToolCall(BaseModel):
+    tool_name: str
+    arguments: Optional[Dict[str, Any]] = None
+
+
+class MCPToolResponse(BaseModel):
+    success: bool
+    result: Any
+    error: Optional[str] = None
+
+
+@app.get("/api")
+async def api_root():
+    """Endpoint raíz de la API"""
+    return {
+        "message": "Bienvenido a miApp API",
+        "version": "1.0.0",
+        "endpoints": {
+            "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
+            "db_pool": "/api/db/pool",
+            "db_executor": "/api/db/executor",
+            "leaderboard_cache": "/api/cache/leaderboard",
+            "ranking_cache": "/api/cache/ranking",
+            "write_behind": "/api/db/write-behind",
+            "admission": "/api/admission",
+            "metrics": "/metrics",
+            "static_manifest": "/api/static/manifest",
+            "docs": "/docs",
+            "redoc": "/redoc",
+            "api": "/api",
+            "mcp": {
+                "list_tools": "/api/mcp/tools",
+                "call_tool": "/api/mcp/call-tool",
+                "stats": "/api/mcp/stats"
+            }
+        }
+    }
+
+
+# ============================================================
+# Dispatcher MCP por tabla (JSON-RPC 2.0)
+# ============================================================
+
+class MCPError(Exception):
+    """Error JSON-RPC que se devuelve al cliente con su código"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class PreEncodedJSON:
+    """Resultado ya codificado a JSON: se inserta tal cual en la respuesta"""
+    __slots__ = ("data",)
+
+    def __init__(self, content: Any):
+        self.data = encode_json(content)
+
+
+class MCPTool:
+    def __init__(self, name: str, description: str, input_schema: Dict[str, Any], handler):
+        self.name = name
+        self.description = description
+        self.input_schema = input_schema
+        self.handler = handler
+
+    def definition(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "inputSchema": self.input_schema
+        }
+
+
+def jsonrpc_result(request_id: Any, result: Any) -> bytes:
+    """Respuesta JSON-RPC con resultado (admite resultados precodificados)"""
+    body = result.data if isinstance(result, PreEncodedJSON) else encode_json(result)
+    return b'{"jsonrpc":"2.0","id":' + encode_json(request_id) + b',"result":' + body + b"}"
+
+
+def jsonrpc_error(request_id: Any, code: int, message: str, data: Any = None) -> bytes:
+    """Respuesta JSON-RPC de error"""
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return encode_json({"jsonrpc": "2.0", "id": request_id, "error": error})
+
+
+class MCPRegistry:
+    """
+    Registro de métodos JSON-RPC y tools MCP.
+    - Cada método/tool registra su handler una sola vez (búsqueda O(1) por nombre)
+    - La respuesta de tools/list se codifica una vez y se reutiliza
+    - Se mide el tiempo de cada método y de cada tool
+    """
+
+    def __init__(self):
+        self._methods: Dict[str, Any] = {}
+        self._tools: Dict[str, MCPTool] = {}
+        self._tools_list: Optional[PreEncodedJSON] = None
+        self._timings: Dict[str, List[float]] = {}
+
+    def method(self, name: str):
+        """Decorador: registrar el handler async(params) de un método JSON-RPC"""
+        def register(handler):
+            self._methods[name] = handler
+            return handler
+        return register
+
+    def tool(self, name: str, description: str, input_schema: Dict[str, Any]):
+        """Decorador: registrar el handler async(arguments) de una tool MCP"""
+        def register(handler):
+            self._tools[name] = MCPTool(name, description, input_schema, handler)
+            self._tools_list = None
+            return handler
+        return register
+
+    def tools_list(self) -> PreEncodedJSON:
+        if self._tools_list is None:
+            self._tools_list = PreEncodedJSON(
+                {"tools": [tool.definition() for tool in self._tools.values()]}
+            )
+        return self._tools_list
+
+    def get_tool(self, name: str) -> Optional[MCPTool]:
+        return self._tools.get(name)
+
+    def record(self, name: str, elapsed: float, failed: bool):
+        MCP_REQUEST_DURATION.labels(name).observe(elapsed)
+        MCP_REQUESTS.labels(name, "error" if failed else "ok").inc()
+        timing = self._timings.get(name)
+        if timing is None:
+            timing = self._timings[name] = [0, 0.0, 0.0, 0]
+        timing[0] += 1
+        timing[1] += elapsed
+        if elapsed > timing[2]:
+            timing[2] = elapsed
+        if failed:
+            timing[3] += 1
+
+    async def handle(self, message: Any) -> Optional[bytes]:
+        """
+        Procesar un mensaje JSON-RPC ya parseado.
+        Devuelve la respuesta codificada, o None si no hay que responder
+        (notificaciones y respuestas del cliente).
+        """
+        if not isinstance(message, dict):
+            return jsonrpc_error(None, -32600, "Invalid Request: body must be a JSON object")
+        
+        request_id = message.get("id")
+        # JSON-RPC 2.0: a una notificación (sin id) no se responde nunca, ni con error
+        is_notification = "id" not in message
+        if message.get("jsonrpc") != "2.0":
+            return None if is_notification else jsonrpc_error(request_id, -32600, "Invalid Request: jsonrpc must be 2.0")
+        
+        method = message.get("method")
+        
+        # Respuestas del cliente (tienen id pero no method)
+        if not method and request_id is not None:
+            logger.debug("Received response from client, returning 202 Accepted")
+            return None
+        if not method:
+            return None if is_notification else jsonrpc_error(request_id, -32600, "Invalid Request: method is required")
+        
+        handler = self._methods.get(method)
+        if handler is None:
+            if is_notification:
+                return None
+            logger.warning("Unknown method: %s", method)
+            return jsonrpc_error(request_id, -32601, f"Method not found: {method}")
+        
+        params = message.get("params")
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            return None if is_notification else jsonrpc_error(request_id, -32602, "Invalid params: params must be an object")
+        
+        logger.debug("Processing method: %s, id: %s", method, request_id)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(params)
+            failed = False
+        except MCPError as e:
+            if is_notification:
+                return None
+            return jsonrpc_error(request_id, e.code, e.message, e.data)
+        except Exception as e:
+            logger.error("Internal error: %s", e, exc_info=True)
+            if is_notification:
+                return None
+            return jsonrpc_error(request_id, -32603, "Internal error", str(e))
+        finally:
+            self.record(method, time.perf_counter() - started, failed)
+        
+        if is_notification:
+            return None
+        return jsonrpc_result(request_id, result)
+
+    async def handle_batch(self, messages: List[Any]) -> Optional[bytes]:
+        """
+        Procesar un batch JSON-RPC: los elementos se ejecutan en paralelo
+        (hasta MCP_BATCH_CONCURRENCY a la vez) y las respuestas mantienen el
+        orden de las peticiones. Las notificaciones no generan respuesta.
+        """
+        if not messages:
+            return jsonrpc_error(None, -32600, "Invalid Request: empty batch")
+        if len(messages) > MCP_BATCH_MAX_SIZE:
+            return jsonrpc_error(None, -32600, f"Invalid Request: batch exceeds {MCP_BATCH_MAX_SIZE} requests")
+        
+        semaphore = asyncio.Semaphore(max(1, MCP_BATCH_CONCURRENCY))
+
+        async def run(message):
+            async with semaphore:
+                return await self.handle(message)
+
+        responses = await asyncio.gather(*(run(message) for message in messages))
+        responses = [response for response in responses if response is not None]
+        if not responses:
+            return None
+        return b"[" + b",".join(responses) + b"]"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "count": count,
+                "errors": errors,
+                "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                "max_ms": round(maximum * 1000, 3)
+            }
+            for name, (count, total, maximum, errors) in self._timings.items()
+        }
+
+
+mcp_registry = MCPRegistry()
+
+
+# ============================================================
+# Sesiones MCP (Mcp-Session-Id)
+# ============================================================
+
+class MCPSession:
+    """Estado negociado en initialize para un cliente"""
+    __slots__ = ("id", "protocol_version", "client_info", "capabilities",
+                 "created_at", "last_seen", "requests")
+
+    def __init__(self, session_id: str, protocol_version: str,
+                 client_info: Dict[str, Any], capabilities: Dict[str, Any]):
+        self.id = session_id
+        self.protocol_version = protocol_version
+        self.client_info = client_info
+        self.capabilities = capabilities
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.requests = 0
+
+
+class MCPSessionStore:
+    """
+    Sesiones en un OrderedDict ordenado por último uso (LRU):
+    - Búsqueda, alta y baja O(1)
+    - Como mucho `max_sessions` sesiones: al crear una nueva se expulsa la
+      menos usada
+    - Las sesiones sin uso durante `idle_ttl` segundos caducan; las más
+      antiguas están al principio, así que la limpieza solo recorre caducadas
+    """
+
+    def __init__(self, max_sessions: int, idle_ttl: float):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, MCPSession]" = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _purge_expired(self, now: float):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self, protocol_version: str, client_info: Dict[str, Any],
+               capabilities: Dict[str, Any]) -> MCPSession:
+        self._purge_expired(time.monotonic())
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        session = MCPSession(secrets.token_urlsafe(24), protocol_version, client_info, capabilities)
+        self._sessions[session.id] = session
+        self.created += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[MCPSession]:
+        """Sesión activa con ese id (renueva su uso) o None si no existe o caducó"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if now - session.last_seen >= self.idle_ttl:
+            del self._sessions[session_id]
+            self.expired += 1
+            return None
+        session.last_seen = now
+        session.requests += 1
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+
+mcp_sessions = MCPSessionStore(MCP_SESSION_MAX, MCP_SESSION_IDLE_TTL)
+
+
+class MCPRequestState:
+    """
+    Estado HTTP de una petición a /mcp compartido con los handlers
+    (también con los de un batch, que corren en tareas propias).
+    """
+    __slots__ = ("session", "new_session")
+
+    def __init__(self, session: Optional[MCPSession]):
+        self.session = session
+        self.new_session: Optional[MCPSession] = None
+
+
+_mcp_request_state: contextvars.ContextVar[Optional[MCPRequestState]] = contextvars.ContextVar(
+    "mcp_request_state", default=None
+)
+
+
+# Resultado de initialize: no depende del cliente, se codifica una sola vez
+MCP_INITIALIZE_RESULT = PreEncodedJSON({
+    "protocolVersion": MCP_PROTOCOL_VERSION,
+    "serverInfo": {
+        "name": "miApp MCP Server",
+        "version": "1.0.0"
+    },
+    "capabilities": {
+        "tools": {
+            "listChanged": False
+        }
+    }
+})
+
+
+@mcp_registry.method("initialize")
+async def mcp_initialize(params: Dict[str, Any]):
+    client_version = params.get("protocolVersion", MCP_PROTOCOL_VERSION)
+    
+    # Validar versión del protocolo
+    if client_version not in COMPATIBLE_MCP_VERSIONS:
+        logger.warning("Incompatible protocol version: %s", client_version)
+        raise MCPError(
+            -32600,
+            f"Unsupported protocol version: {client_version}",
+            {"supportedVersions": COMPATIBLE_MCP_VERSIONS}
+        )
+    
+    # La sesión guarda lo negociado; el id viaja en la cabecera Mcp-Session-Id
+    state = _mcp_request_state.get()
+    if state is not None:
+        state.new_session = mcp_sessions.create(
+            client_version,
+            params.get("clientInfo") or {},
+            params.get("capabilities") or {}
+        )
+    
+    logger.debug("Initialize successful with version %s", client_version)
+    return MCP_INITIALIZE_RESULT
+
+
+@mcp_registry.method("notifications/initialized")
+async def mcp_notifications_initialized(params: Dict[str, Any]):
+    logger.debug("Handling notifications/initialized - returning 202 Accepted")
+    return None
+
+
+@mcp_registry.method("tools/list")
+async def mcp_tools_list(params: Dict[str, Any]):
+    return mcp_registry.tools_list()
+
+
+@mcp_registry.method("tools/call")
+async def mcp_tools_call(params: Dict[str, Any]):
+    tool_name = params.get("name")
+    arguments = params.get("arguments") or {}
+    
+    logger.debug("Calling tool: %s with args: %s", tool_name, arguments)
+    
+    # Token de progreso del cliente: solo se usa si la respuesta va por SSE
+    stream = _mcp_stream.get()
+    if stream is not None:
+        meta = params.get("_meta")
+        if isinstance(meta, dict):
+            stream.progress_token = meta.get("progressToken")
+    
+    tool = mcp_registry.get_tool(tool_name)
+    if tool is None:
+        logger.warning("Unknown tool: %s", tool_name)
+        raise MCPError(-32602, f"Unknown tool: {tool_name}")
+    
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = await tool.handler(arguments)
+        failed = False
+    except (AdmissionRejected, DBExecutorSaturated) as e:
+        raise MCPError(-32000, f"Server busy: {e}", {"retryAfter": ADMISSION_RETRY_AFTER})
+    finally:
+        mcp_registry.record(f"tools/call:{tool_name}", time.perf_counter() - started, failed)
+    
+    logger.debug("Tool execution successful")
+    return result
+
+
+# ============================================================
+# Transporte Streamable HTTP (SSE)
+# ============================================================
+
+def sse_event(data: bytes) -> bytes:
+    """Evento SSE con un mensaje JSON-RPC ya codificado (una sola línea)"""
+    return b"event: message\ndata: " + data + b"\n\n"
+
+
+def jsonrpc_notification(method: str, params: Dict[str, Any]) -> bytes:
+    return encode_json({"jsonrpc": "2.0", "method": method, "params": params})
+
+
+class MCPStream:
+    """
+    Canal de una petición POST /mcp respondida con text/event-stream.
+    Los handlers publican notificaciones mientras se ejecutan y el
+    generador SSE las envía al cliente antes de la respuesta final.
+    """
+    __slots__ = ("queue", "progress_token")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.progress_token: Any = None
+
+    def send(self, message: bytes):
+        self.queue.put_nowait(message)
+
+
+# Stream de la petición en curso (None si la respuesta es JSON normal)
+_mcp_stream: contextvars.ContextVar[Optional[MCPStream]] = contextvars.ContextVar("mcp_stream", default=None)
+
+
+def mcp_report_progress(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+    """
+    Enviar notifications/progress al cliente. No hace nada si la respuesta
+    no va por SSE o si el cliente no envió _meta.progressToken.
+    """
+    stream = _mcp_stream.get()
+    if stream is None or stream.progress_token is None:
+        return
+    params: Dict[str, Any] = {"progressToken": stream.progress_token, "progress": progress}
+    if total is not None:
+        params["total"] = total
+    if message is not None:
+        params["message"] = message
+    stream.send(jsonrpc_notification("notifications/progress", params))
+
+
+async def mcp_sse_response_stream(message: Dict[str, Any], state: MCPRequestState, on_close):
+    """
+    Ejecutar una petición MCP y emitir su salida como eventos SSE:
+    primero un comentario (el cliente recibe cabeceras y primer byte de
+    inmediato), luego las notificaciones de progreso y al final la respuesta.
+    `on_close(bytes_out)` se llama al terminar o si el cliente se desconecta.
+    """
+    stream = MCPStream()
+    token = _mcp_stream.set(stream)
+    state_token = _mcp_request_state.set(state)
+    try:
+        # La tarea copia el contexto actual, con el stream ya asignado
+        task = asyncio.create_task(mcp_registry.handle(message))
+    finally:
+        _mcp_request_state.reset(state_token)
+        _mcp_stream.reset(token)
+    task.add_done_callback(lambda _: stream.queue.put_nowait(None))
+    
+    bytes_out = 0
+    try:
+        chunk = b": stream open\n\n"
+        bytes_out += len(chunk)
+        yield chunk
+        while True:
+            try:
+                item = await asyncio.wait_for(stream.queue.get(), MCP_SSE_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                chunk = b": ping\n\n"
+            else:
+                if item is None:
+                    break
+                chunk = sse_event(item)
+            bytes_out += len(chunk)
+            yield chunk
+        
+        response = task.result()
+        if response is not None:
+            chunk = sse_event(response)
+            bytes_out += len(chunk)
+            yield chunk
+    finally:
+        if not task.done():
+            task.cancel()
+        on_close(bytes_out)
+
+
+class MCPServerEvents:
+    """
+    Mensajes iniciados por el servidor (GET /mcp con text/event-stream).
+    Cada suscriptor tiene una cola acotada: si un cliente lento la llena,
+    los mensajes nuevos se descartan para él en lugar de acumular memoria.
+    """
+
+    def __init__(self, max_streams: int, queue_size: int):
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self._subscribers: set = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> Optional[asyncio.Queue]:
+        if len(self._subscribers) >= self.max_streams:
+            return None
+        subscriber: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, method: str, params: Dict[str, Any]):
+        """Encolar una notificación para todos los streams abiertos (se codifica una vez)"""
+        if not self._subscribers:
+            return
+        event = sse_event(jsonrpc_notification(method, params))
+        self.published += 1
+        for subscriber in self._subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    async def stream(self, subscriber: asyncio.Queue):
+        try:
+            yield b": stream open\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.get(), MCP_SSE_PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    event = b": ping\n\n"
+                if event is None:
+                    break
+                yield event
+        finally:
+            self.unsubscribe(subscriber)
+
+    def close(self):
+        """Cerrar todos los streams (apagado): se descarta lo pendiente"""
+        for subscriber in list(self._subscribers):
+            while not subscriber.empty():
+                subscriber.get_nowait()
+            subscriber.put_nowait(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "streams": len(self._subscribers),
+            "max_streams": self.max_streams,
+            "published": self.published,
+            "dropped": self.dropped
+        }
+
+
+mcp_server_events = MCPServerEvents(MCP_SSE_MAX_STREAMS, MCP_SSE_QUEUE_SIZE)
+
+
+def mcp_text_content(data: Any) -> Dict[str, Any]:
+    """Resultado de tool MCP con el JSON de `data` como contenido de texto"""
+    return {
+        "content": [
+            {
+                "type": "text",
+                "text": json.dumps(data, indent=2, ensure_ascii=False)
+            }
+        ]
+    }
+
+
+# ============================================================
+# Tools MCP
+# ============================================================
+
+DEMO_USER = {
+    "email": "benito@gmail.com",
+    "name": "Benito Martínez",
+    "username": "benito_m",
+    "id": "usr_12345",
+    "status": "active"
+}
+
+DEMO_USER_DETAILS = {
+    "created_at": "2024-01-15T10:30:00Z",
+    "last_login": "2025-12-23T08:15:30Z",
+    "role": "premium_user",
+    "preferences": {
+        "language": "es",
+        "notifications": True,
+        "theme": "dark"
+    },
+    "stats": {
+        "total_games": 42,
+        "high_score": 1250,
+        "achievements": 15
+    }
+}
+
+# Los datos de demo son fijos: las dos variantes se codifican una sola vez
+DEMO_USER_RESULTS = {
+    False: PreEncodedJSON(mcp_text_content(DEMO_USER)),
+    True: PreEncodedJSON(mcp_text_content({**DEMO_USER, **DEMO_USER_DETAILS}))
+}
+
+
+@mcp_registry.tool(
+    "get_user_demo",
+    "Obtiene datos de demostración de un usuario. Retorna información de perfil con email benito@gmail.com, nombre, estadísticas y preferencias.",
+    {
+        "type": "object",
+        "properties": {
+            "include_details": {
+                "type": "boolean",
+                "description": "Si es true, incluye detalles adicionales del usuario como estadísticas, preferencias y fechas",
+                "default": True
+            }
+        }
+    }
+)
+async def tool_get_user_demo(arguments: Dict[str, Any]):
+    return DEMO_USER_RESULTS[bool(arguments.get("include_details", True))]
+
+
+# ============================================================
+# Tools MCP de Snake Scores (con caché de resultados)
+# ============================================================
+
+class MCPResultCache:
+    """
+    Caché TTL + LRU de resultados de tools, con clave (tool, argumentos
+    canónicos). Los resultados se guardan ya codificados.
+    `invalidate()` vacía la caché al insertar scores; el contador de
+    generación evita guardar un resultado calculado antes de la invalidación.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, PreEncodedJSON]]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+    async def get_or_compute(self, tool_name: str, arguments: Dict[str, Any], compute) -> PreEncodedJSON:
+        """Resultado cacheado o `await compute()` (que devuelve el resultado de la tool)"""
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return PreEncodedJSON(await compute())
+        
+        key = self.key(tool_name, arguments)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        generation = self._generation
+        result = PreEncodedJSON(await compute())
+        if generation == self._generation:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self):
+        self._generation += 1
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+
+mcp_result_cache = MCPResultCache(MCP_TOOL_CACHE_SIZE, MCP_TOOL_CACHE_TTL)
+
+
+def mcp_int_argument(arguments: Dict[str, Any], name: str, default: int, minimum: int, maximum: int) -> int:
+    value = arguments.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise MCPError(-32602, f"Invalid params: {name} must be an integer")
+    if not minimum <= value <= maximum:
+        raise MCPError(-32602, f"Invalid params: {name} must be between {minimum} and {maximum}")
+    return value
+
+
+def mcp_player_name_argument(arguments: Dict[str, Any]) -> str:
+    player_name = arguments.get("player_name")
+    if not isinstance(player_name, str) or not player_name.strip():
+        raise MCPError(-32602, "Invalid params: player_name is required")
+    return player_name.strip()
+
+
+def mcp_error_content(message: str) -> Dict[str, Any]:
+    """Resultado de tool con error de ejecución (el cliente lo ve como isError)"""
+    return {"content": [{"type": "text", "text": message}], "isError": True}
+
+
+@mcp_registry.tool(
+    "get_top_scores",
+    "Obtiene los mejores scores del juego Snake (ranking global), ordenados de mayor a menor.",
+    {
+        "type": "object",
+        "properties": {
+            "limit": {
+                "type": "integer",
+                "description": "Cantidad de scores a devolver",
+                "minimum": 1,
+                "maximum": TOP_SCORES_MAX_LIMIT,
+                "default": 10
+            }
+        }
+    }
+)
+async def tool_get_top_scores(arguments: Dict[str, Any]):
+    limit = mcp_int_argument(arguments, "limit", 10, 1, TOP_SCORES_MAX_LIMIT)
+
+    async def compute():
+        cached = cached_leaderboard(limit)
+        async with admission.slot("mcp", bypass=cached is not None):
+            return mcp_text_content(await get_leaderboard(limit, cached, lookup=False))
+
+    return await mcp_result_cache.get_or_compute("get_top_scores", {"limit": limit}, compute)
+
+
+@mcp_registry.tool(
+    "get_player_scores",
+    "Obtiene los scores de un jugador del juego Snake, de mayor a menor, paginados. Si hay más resultados devuelve next_cursor.",
+    {
+        "type": "object",
+        "properties": {
+            "player_name": {
+                "type": "string",
+                "description": "Nombre del jugador"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Cantidad de scores por página",
+                "minimum": 1,
+                "maximum": PLAYER_SCORES_MAX_PAGE_SIZE,
+                "default": PLAYER_SCORES_PAGE_SIZE
+            },
+            "cursor": {
+                "type": "string",
+                "description": "Cursor de la página siguiente (next_cursor de la respuesta anterior)"
+            }
+        },
+        "required": ["player_name"]
+    }
+)
+async def tool_get_player_scores(arguments: Dict[str, Any]):
+    player_name = mcp_player_name_argument(arguments)
+    limit = mcp_int_argument(arguments, "limit", PLAYER_SCORES_PAGE_SIZE, 1, PLAYER_SCORES_MAX_PAGE_SIZE)
+    cursor = arguments.get("cursor") or None
+    try:
+        after = decode_score_cursor(cursor) if cursor else None
+    except (TypeError, ValueError):
+        raise MCPError(-32602, "Invalid params: invalid cursor")
+
+    async def compute():
+        async with admission.slot("mcp", bypass=score_replica.is_fresh()):
+            scores, next_cursor = await read_player_scores(player_name, limit, after)
+        return mcp_text_content({"player_name": player_name, "scores": scores, "next_cursor": next_cursor})
+
+    return await mcp_result_cache.get_or_compute(
+        "get_player_scores",
+        {"player_name": player_name, "limit": limit, "cursor": cursor},
+        compute
+    )
+
+
+@mcp_registry.tool(
+    "get_player_rank",
+    "Obtiene la posición en el ranking global y el percentil del mejor score de un jugador del juego Snake.",
+    {
+        "type": "object",
+        "properties": {
+            "player_name": {
+                "type": "string",
+                "description": "Nombre del jugador"
+            }
+        },
+        "required": ["player_name"]
+    }
+)
+async def tool_get_player_rank(arguments: Dict[str, Any]):
+    player_name = mcp_player_name_argument(arguments)
+
+    async def compute():
+        async with admission.slot("mcp", bypass=player_ranking.loaded):
+            ranking = await get_player_ranking()
+        rank = ranking.player_rank(player_name)
+        if rank is None:
+            return mcp_error_content(f"Jugador no encontrado: {player_name}")
+        return mcp_text_content({"PlayerName": player_name, **rank})
+
+    return await mcp_result_cache.get_or_compute("get_player_rank", {"player_name": player_name}, compute)
+
+
+@mcp_registry.tool(
+    "get_score_stats",
+    "Obtiene estadísticas generales del juego Snake: total de partidas y jugadores, mejor score, promedio y fechas de la primera y última partida.",
+    {
+        "type": "object",
+        "properties": {}
+    }
+)
+async def tool_get_score_stats(arguments: Dict[str, Any]):
+    async def compute():
+        async with admission.slot("mcp"):
+            return mcp_text_content(await db_executor.run(fetch_score_stats))
+
+    return await mcp_result_cache.get_or_compute("get_score_stats", {}, compute)
+
+
+# ============================================================
+# Endpoint MCP
+# ============================================================
+
+def _log_mcp_headers(raw_request: Request):
+    """Volcado completo de headers (solo en MCP_LOG_MODE=verbose)"""
+    logger.info("=== MCP Request Headers ===")
+    for header_name, header_value in raw_request.headers.items():
+        if header_name.lower() == "authorization":
+            logger.info("  %s: [REDACTED]", header_name)
+        else:
+            logger.info("  %s: %s", header_name, header_value)
+
+
+def _should_log_mcp_body() -> bool:
+    if MCP_LOG_MODE == "verbose":
+        return True
+    return MCP_LOG_BODY_SAMPLE_RATE > 0 and random.random() < MCP_LOG_BODY_SAMPLE_RATE
+
+
+def _log_mcp_request(method: str, request_id: Any, status_code: int, bytes_in: int,
+                     bytes_out: int, started: float, transport: str = "json"):
+    logger.info(
+        "mcp method=%s id=%s status=%d transport=%s bytes_in=%d bytes_out=%d duration_ms=%.2f",
+        method, request_id, status_code, transport, bytes_in, bytes_out,
+        (time.perf_counter() - started) * 1000
+    )
+
+
+def _accepts_event_stream(raw_request: Request) -> bool:
+    return MCP_SSE_ENABLED and "text/event-stream" in raw_request.headers.get("accept", "")
+
+
+def _wants_sse_response(raw_request: Request, req_body: Any) -> bool:
+    """
+    Responder con SSE solo a peticiones que pueden tardar (tools/call) o si
+    el cliente no acepta application/json. Las notificaciones y los batches
+    se responden siempre con JSON.
+    """
+    if not _accepts_event_stream(raw_request):
+        return False
+    if not isinstance(req_body, dict) or "id" not in req_body:
+        return False
+    accept = raw_request.headers.get("accept", "")
+    return req_body.get("method") == "tools/call" or "application/json" not in accept
+
+
+def _resolve_mcp_session(raw_request: Request) -> Optional[MCPSession]:
+    """
+    Sesión indicada en Mcp-Session-Id (404 si no existe o caducó: el cliente
+    debe repetir initialize). Sin sesión, se valida MCP-Protocol-Version en
+    cada petición; con sesión ya se validó en initialize.
+    """
+    session_id = raw_request.headers.get("mcp-session-id")
+    if session_id:
+        session = mcp_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired MCP session")
+        return session
+    
+    protocol_version = raw_request.headers.get("mcp-protocol-version")
+    if protocol_version and protocol_version not in COMPATIBLE_MCP_VERSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported MCP-Protocol-Version: {protocol_version}")
+    return None
+
+
+def _session_headers(state: MCPRequestState) -> Optional[Dict[str, str]]:
+    session = state.new_session or state.session
+    return {"Mcp-Session-Id": session.id} if session is not None else None
+
+
+def _describe_mcp_request(req_body: Any) -> Tuple[str, Any]:
+    """Método e id para la línea de log (batches: 'batch[n]')"""
+    if isinstance(req_body, list):
+        return f"batch[{len(req_body)}]", None
+    if isinstance(req_body, dict):
+        return str(req_body.get("method") or "-"), req_body.get("id")
+    return "-", None
+
+
+@app.post("/mcp")
+async def mcp_jsonrpc_handler(raw_request: Request):
+    """
+    Manejador principal de JSON-RPC 2.0 para MCP.
+    Acepta peticiones individuales o batches (arrays).
+    Los métodos y tools se resuelven en mcp_registry.
+    Si el cliente acepta text/event-stream, tools/call se responde por SSE
+    (notificaciones de progreso y luego la respuesta).
+    Loguea una sola línea por petición (MCP_LOG_MODE=verbose para depurar).
+    """
+    started = time.perf_counter()
+    if MCP_LOG_MODE == "verbose":
+        _log_mcp_headers(raw_request)
+    
+    state = MCPRequestState(_resolve_mcp_session(raw_request))
+    
+    # Obtener el body JSON
+    body = await raw_request.body()
+    if _should_log_mcp_body():
+        logger.info(
+            "MCP Request body (%d bytes): %s",
+            len(body), body[:MCP_LOG_BODY_MAX_BYTES].decode("utf-8", errors="replace")
+        )
+    
+    method, request_id = "-", None
+    status_code = 200
+    response_size = 0
+    streaming = False
+    transport = "json"
+    # Se asigna ya leído el body: si la lectura falla no queda nada que restaurar
+    state_token = _mcp_request_state.set(state)
+    try:
+        try:
+            req_body = orjson.loads(body) if orjson is not None else json.loads(body)
+        except ValueError:
+            method = "parse_error"
+            response_body = jsonrpc_error(None, -32700, "Parse error: Invalid JSON")
+        else:
+            method, request_id = _describe_mcp_request(req_body)
+            sse = _wants_sse_response(raw_request, req_body)
+            if sse and req_body.get("method") != "tools/call":
+                # Métodos sin progreso (initialize incluido): se resuelven antes de
+                # responder para que los headers lleven la sesión que se haya creado
+                response_body = await mcp_registry.handle(req_body)
+                if response_body is not None:
+                    transport = "sse"
+                    response_size = len(response_body)
+                    return Response(
+                        content=sse_event(response_body),
+                        media_type="text/event-stream",
+                        headers={"Cache-Control": "no-cache", **(_session_headers(state) or {})}
+                    )
+            elif sse:
+                streaming = True
+                return StreamingResponse(
+                    mcp_sse_response_stream(
+                        req_body,
+                        state,
+                        lambda bytes_out: _log_mcp_request(
+                            method, request_id, 200, len(body), bytes_out, started, "sse"
+                        )
+                    ),
+                    media_type="text/event-stream",
+                    headers={
+                        "Cache-Control": "no-cache",
+                        "X-Accel-Buffering": "no",
+                        **(_session_headers(state) or {})
+                    }
+                )
+            elif isinstance(req_body, list):
+                response_body = await mcp_registry.handle_batch(req_body)
+            else:
+                response_body = await mcp_registry.handle(req_body)
+        
+        if response_body is None:
+            status_code = 202
+            return Response(status_code=202)
+        response_size = len(response_body)
+        return Response(content=response_body, media_type="application/json", headers=_session_headers(state))
+    finally:
+        _mcp_request_state.reset(state_token)
+        # Las respuestas SSE se loguean al cerrar el stream
+        if not streaming:
+            _log_mcp_request(method, request_id, status_code, len(body), response_size, started, transport)
+
+
+@app.get("/mcp")
+async def mcp_info(raw_request: Request):
+    """
+    Con Accept: text/event-stream abre un stream SSE para mensajes
+    iniciados por el servidor. Sin él, verifica que el endpoint está activo.
+    """
+    if not _accepts_event_stream(raw_request):
+        _resolve_mcp_session(raw_request)
+        return {
+            "status": "ready",
+            "protocol": "MCP",
+            "version": MCP_PROTOCOL_VERSION,
+            "transport": "streamable-http" if MCP_SSE_ENABLED else "http"
+        }
+    
+    _resolve_mcp_session(raw_request)
+    subscriber = mcp_server_events.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many open MCP streams")
+    return StreamingResponse(
+        mcp_server_events.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.delete("/mcp")
+async def mcp_delete_session(raw_request: Request):
+    """Terminar la sesión indicada en Mcp-Session-Id"""
+    session_id = raw_request.headers.get("mcp-session-id")
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Mcp-Session-Id header is required")
+    if not mcp_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired MCP session")
+    return Response(status_code=204)
+
+
+@app.get("/api/mcp/stats")
+async def mcp_stats():
+    """Tiempos de ejecución por método y tool MCP y streams SSE abiertos"""
+    return {
+        **mcp_registry.stats(),
+        "sse": mcp_server_events.stats(),
+        "sessions": mcp_sessions.stats(),
+        "tool_cache": mcp_result_cache.stats()
+    }
+
+
+# ============================================================
+# Archivos estáticos (manifest en memoria)
+# ============================================================
+
+# Bundles de Angular con hash en el nombre: main-5XQ3JIMD.js (esbuild) o main.3f2a9c1b0e5d7a44.js (webpack)
+HASHED_ASSET_RE = re.compile(r"(?:-[A-Z0-9]{8}|\.[0-9a-f]{16,20})\.[A-Za-z0-9]+$")
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+
+
+class StaticAsset:
+    """Un archivo de www/ con sus variantes comprimidas ya calculadas"""
+    __slots__ = ("path", "content_type", "cache_control", "variants")
+
+    def __init__(self, path: Path, content_type: str, cache_control: str):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # encoding ("identity", "br", "gzip") -> (body o None si se sirve del disco, etag)
+        self.variants: Dict[str, Tuple[Optional[bytes], str]] = {}
+
+
+class StaticAssetManifest:
+    """
+    Índice en memoria de www/ construido al arrancar: ruta -> contenido,
+    ETag fuerte, Content-Type, Cache-Control y variantes br/gzip (las que
+    existan en disco como .br/.gz o se generen al cargar).
+    Servir un archivo no hace ninguna llamada al sistema de archivos, salvo
+    los que superan STATIC_MAX_INMEMORY_BYTES.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._assets: Dict[str, StaticAsset] = {}
+        self.hits = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _cache_control(relative: str) -> str:
+        if HASHED_ASSET_RE.search(relative):
+            return "public, max-age=31536000, immutable"
+        if relative.endswith(".html"):
+            return "no-cache"
+        return f"public, max-age={STATIC_DEFAULT_MAX_AGE}"
+
+    def _load_asset(self, file_path: Path, relative: str) -> StaticAsset:
+        content_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+        asset = StaticAsset(file_path, content_type, self._cache_control(relative))
+        
+        stat = file_path.stat()
+        if stat.st_size > STATIC_MAX_INMEMORY_BYTES:
+            asset.variants["identity"] = (None, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"')
+            return asset
+        
+        content = file_path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:20]
+        asset.variants["identity"] = (content, f'"{digest}"')
+        if len(content) < STATIC_COMPRESS_MIN_BYTES or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return asset
+        
+        # Variantes precomprimidas: se usan las del build si existen
+        br_file = file_path.with_name(file_path.name + ".br")
+        gz_file = file_path.with_name(file_path.name + ".gz")
+        if br_file.is_file():
+            compressed = br_file.read_bytes()
+        elif brotli is not None:
+            compressed = brotli.compress(content, quality=11)
+        else:
+            compressed = None
+        if compressed is not None and len(compressed) < len(content):
+            asset.variants["br"] = (compressed, f'"{digest}-br"')
+        
+        compressed = gz_file.read_bytes() if gz_file.is_file() else gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            asset.variants["gzip"] = (compressed, f'"{digest}-gz"')
+        return asset
+
+    def load(self):
+        """Recorrer www/ y construir el manifest (se reemplaza de una vez)"""
+        assets: Dict[str, StaticAsset] = {}
+        for file_path in self.root.rglob("*"):
+            if not file_path.is_file() or file_path.suffix in (".gz", ".br"):
+                continue
+            relative = file_path.relative_to(self.root).as_posix()
+            try:
+                assets[relative] = self._load_asset(file_path, relative)
+            except OSError as e:
+                logger.warning(f"Could not load static asset {relative}: {e}")
+        self._assets = assets
+
+    def get(self, relative: str) -> Optional[StaticAsset]:
+        return self._assets.get(relative)
+
+    def response(self, asset: StaticAsset, request: Request) -> Response:
+        """Respuesta para un asset: 304 si el ETag coincide, si no la mejor variante aceptada"""
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), asset.variants)
+        body, etag = asset.variants[encoding]
+        
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        
+        self.hits += 1
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        if body is None:
+            return FileResponse(str(asset.path), media_type=asset.content_type, headers=headers)
+        return Response(content=body, media_type=asset.content_type, headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._assets),
+            "bytes": sum(len(body) for asset in self._assets.values()
+                         for body, _ in asset.variants.values() if body is not None),
+            "brotli": brotli is not None,
+            "hits": self.hits,
+            "not_modified": self.not_modified
+        }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista de ETags o *)"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding -> {codificación: q} (q inválido o ausente = 1)"""
+    weights: Dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value.strip()), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate_encoding(header: str, available) -> str:
+    """
+    Mejor codificación de `available` según Accept-Encoding (RFC 9110):
+    q=0 la excluye, "*" cubre las no listadas y, a igual q, se prefiere
+    br > gzip > identity. Si ninguna es aceptable se sirve identity.
+    """
+    weights = parse_accept_encoding(header)
+    # identity sin listar no compite: cualquier variante aceptada es mejor
+    best, best_q = "identity", weights.get("identity", 0.0)
+    for encoding in ("gzip", "br"):
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > 0 and q >= best_q:
+            best, best_q = encoding, q
+    return best
+
+
+static_assets = StaticAssetManifest(WWW_DIR)
+
+
+@app.get("/api/static/manifest")
+async def static_manifest_stats():
+    """Estadísticas del manifest de archivos estáticos"""
+    return static_assets.stats()
+
+
+@app.get("/")
+async def serve_spa(request: Request):
+    """Servir el frontend Angular"""
+    if STATIC_MANIFEST:
+        index_asset = static_assets.get("index.html")
+        if index_asset is not None:
+            return static_assets.response(index_asset, request)
+    else:
+        index_file = WWW_DIR / "index.html"
+        if index_file.exists():
+            return FileResponse(str(index_file))
+    return {"message": "Frontend no encontrado. Asegúrate de compilar la aplicación Angular."}
+
+
+@app.get("/health")
+async def health_check():
+    """
+    Endpoint de health check que informa:
+    - Estado de la aplicación
+    - Conexión a la base de datos (último sondeo en segundo plano, sin coste por petición)
+    """
+    db_status = db_health.status()
+    
+    health_status = {
+        "status": "healthy" if db_health.ready else "unhealthy",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "checks": {
+            "application": {
+                "status": "up",
+                "message": "Application is running"
+            },
+            "database": db_status
+        }
+    }
+    
+    if not db_health.ready:
+        return JSONResponse(
+            status_code=503,
+            content=health_status
+        )
+    
+    return health_status
+
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: el proceso responde (no toca la base de datos)"""
+    return {"status": "alive", "timestamp": datetime.utcnow().isoformat() + "Z"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: resultado del último sondeo de la BD y su antigüedad"""
+    content = {
+        "status": "ready" if db_health.ready else "not_ready",
+        "database": db_health.status()
+    }
+    if not db_health.ready:
+        return JSONResponse(status_code=503, content=content)
+    return content
+
+
+@app.get("/api/db/pool")
+async def db_pool_stats():
+    """Estadísticas del pool de conexiones a la base de datos"""
+    return db_pool.stats()
+
+
+@app.get("/api/cache/leaderboard")
+async def leaderboard_cache_stats():
+    """Estadísticas de la caché del leaderboard"""
+    return leaderboard_cache.stats()
+
+
+@app.get("/api/cache/leaderboard/windows")
+async def windowed_leaderboards_stats():
+    """Estadísticas de los leaderboards por ventana"""
+    return {period: leaderboard.stats() for period, leaderboard in windowed_leaderboards.items()}
+
+
+@app.get("/api/cache/ranking")
+async def player_ranking_stats():
+    """Estadísticas del ranking de jugadores en memoria"""
+    return player_ranking.stats()
+
+
+@app.get("/api/db/write-behind")
+async def score_writer_stats():
+    """Estadísticas del write-behind de scores"""
+    return score_writer.stats()
+
+
+def _register_state_gauges():
+    """Gauges de estado leídas de los componentes en cada scrape"""
+    metrics.gauge_callback("db_pool_connections", "Conexiones del pool por estado", lambda: {
+        'state="idle"': db_pool.stats()["idle"],
+        'state="in_use"': db_pool.stats()["in_use"]
+    })
+    metrics.gauge_callback("db_executor_calls", "Llamadas del executor de BD por estado", lambda: {
+        'state="queued"': db_executor.stats()["queue_depth"],
+        'state="running"': db_executor.stats()["running"]
+    })
+    metrics.gauge_callback("admission_requests", "Peticiones en el control de admisión por ruta y estado", lambda: {
+        f'route="{route}",state="{state}"': stats[state]
+        for route, stats in admission.stats()["routes"].items()
+        for state in ("active", "waiting")
+    })
+    metrics.gauge_callback("read_replica_lag_seconds", "Segundos desde la última sincronización de la réplica",
+                           lambda: score_replica.lag() if score_replica.enabled and score_replica.lag() is not None else {})
+
+
+_register_state_gauges()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas en formato de texto Prometheus"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/admission")
+async def admission_stats():
+    """Estado del control de admisión por ruta (activas, en espera, rechazadas)"""
+    return admission.stats()
+
+
+@app.get("/api/db/replica")
+async def read_replica_stats():
+    """Estado de la réplica de lectura (filas, retraso, aciertos y lecturas desviadas a la BD)"""
+    return score_replica.stats()
+
+
+@app.get("/api/db/executor")
+async def db_executor_stats():
+    """Métricas del executor de base de datos (cola y tiempos de espera)"""
+    return db_executor.stats()
+
+
+# ============================================================
+# Acceso a datos de Snake Scores (síncrono, se ejecuta en db_executor)
+# ============================================================
+
+def _format_db_datetime(value) -> str:
+    """Mismo formato que FORMAT(..., 'yyyy-MM-dd HH:mm:ss'), pero en Python (mucho más barato que en SQL Server)"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return str(value)
+
+
+def _score_row_to_dict(row) -> Dict[str, Any]:
+    """Fila (Id, PlayerName, Score, GameDate, CreatedAt) -> dict de respuesta, por posición"""
+    return {
+        "Id": row[0],
+        "PlayerName": row[1],
+        "Score": row[2],
+        "GameDate": _format_db_datetime(row[3]),
+        "CreatedAt": _format_db_datetime(row[4])
+    }
+
+
+def insert_snake_score(player_name: str, score: int) -> Optional[Dict[str, Any]]:
+    """Insertar un score y devolver la fila creada (con el Id asignado)"""
+    query = """
+        INSERT INTO dbo.SnakeScores (PlayerName, Score, GameDate)
+        OUTPUT INSERTED.Id, INSERTED.GameDate, INSERTED.CreatedAt
+        VALUES (?, ?, GETDATE());
+    """
+    
+    with db_pool.connection() as db:
+        result = db.fetchone(query, player_name, score)
+        db.commit()
+    
+    if not result:
+        return None
+    score_replica.record_inserted([(int(result[0]), player_name, score, result[1], result[2])])
+    return {
+        "Id": int(result[0]),
+        "PlayerName": player_name,
+        "Score": score,
+        "GameDate": _format_db_datetime(result[1]),
+        "CreatedAt": _format_db_datetime(result[2])
+    }
+
+
+def insert_snake_scores_batch(scores: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """
+    Insertar muchos scores en una sola transacción y devolver las filas creadas
+    en el mismo orden de entrada.
+    Los parámetros se cargan con fast_executemany en una tabla temporal y se
+    copian con un único INSERT ... SELECT ORDER BY Seq: SQL Server asigna los
+    IDENTITY en el orden del ORDER BY, así que los Ids ordenados corresponden
+    a las filas de entrada en orden.
+    """
+    if not scores:
+        return []
+    
+    with db_pool.connection() as db:
+        db.execute("""
+            CREATE TABLE #SnakeScoresStaging (
+                Seq INT NOT NULL,
+                PlayerName NVARCHAR(100) NOT NULL,
+                Score INT NOT NULL
+            );
+        """)
+        db.executemany(
+            "INSERT INTO #SnakeScoresStaging (Seq, PlayerName, Score) VALUES (?, ?, ?);",
+            [(seq, player_name, score) for seq, (player_name, score) in enumerate(scores)]
+        )
+        inserted = sorted(db.fetchall("""
+            INSERT INTO dbo.SnakeScores (PlayerName, Score, GameDate)
+            OUTPUT INSERTED.Id, INSERTED.GameDate, INSERTED.CreatedAt
+            SELECT PlayerName, Score, GETDATE()
+            FROM #SnakeScoresStaging
+            ORDER BY Seq;
+        """), key=lambda row: row[0])
+        # Si algo falla antes, el rollback del pool deshace también la tabla temporal
+        db.execute("DROP TABLE #SnakeScoresStaging;")
+        db.commit()
+    
+    score_replica.record_inserted([
+        (int(row[0]), player_name, score, row[1], row[2])
+        for (player_name, score), row in zip(scores, inserted)
+    ])
+    return [
+        {
+            "Id": int(row[0]),
+            "PlayerName": player_name,
+            "Score": score,
+            "GameDate": _format_db_datetime(row[1]),
+            "CreatedAt": _format_db_datetime(row[2])
+        }
+        for (player_name, score), row in zip(scores, inserted)
+    ]
+
+
+def fetch_top_scores(limit: int) -> List[Dict[str, Any]]:
+    """Obtener los mejores scores (top N)"""
+    query = """
+        SELECT TOP (?) 
+            Id,
+            PlayerName,
+            Score,
+            GameDate,
+            CreatedAt
+        FROM dbo.SnakeScores
+        ORDER BY Score DESC, GameDate DESC
+    """
+    
+    with db_pool.connection() as db:
+        rows = db.fetchall(query, limit)
+    
+    return [_score_row_to_dict(row) for row in rows]
+
+
+def encode_score_cursor(score: int, game_date, score_id: int) -> str:
+    """Cursor opaco (base64url) con la clave de orden (Score, GameDate, Id)"""
+    if isinstance(game_date, datetime):
+        game_date = game_date.isoformat()
+    payload = json.dumps([score, str(game_date), score_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_score_cursor(cursor: str) -> Tuple[int, Any, int]:
+    """Decodificar un cursor de encode_score_cursor (ValueError si es inválido)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, game_date, score_id = json.loads(base64.urlsafe_b64decode(padded))
+        try:
+            game_date = datetime.fromisoformat(game_date)
+        except ValueError:
+            pass
+        return int(score), game_date, int(score_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def fetch_player_scores(
+    player_name: str,
+    page_size: int = PLAYER_SCORES_PAGE_SIZE,
+    after: Optional[Tuple[int, Any, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Obtener una página de scores de un jugador, paginando por keyset sobre
+    (Score DESC, GameDate DESC, Id DESC). Devuelve las filas y el cursor
+    de la página siguiente (None si no hay más).
+    """
+    select = """
+        SELECT TOP (?) 
+            Id,
+            PlayerName,
+            Score,
+            GameDate,
+            CreatedAt
+        FROM dbo.SnakeScores
+        WHERE PlayerName = ?
+    """
+    order_by = """
+        ORDER BY Score DESC, GameDate DESC, Id DESC
+    """
+    
+    # Se pide una fila de más para saber si existe otra página
+    with db_pool.connection() as db:
+        if after is None:
+            rows = db.fetchall(select + order_by, page_size + 1, player_name)
+        else:
+            score, game_date, score_id = after
+            query = select + """
+                AND (Score < ?
+                     OR (Score = ? AND (GameDate < ?
+                                        OR (GameDate = ? AND Id < ?))))
+            """ + order_by
+            rows = db.fetchall(
+                query, page_size + 1, player_name,
+                score, score, game_date, game_date, score_id
+            )
+    
+    return _player_scores_page(rows, page_size)
+
+
+def _player_scores_page(rows, page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Hasta `page_size + 1` filas ordenadas -> (página, cursor de la siguiente o None)"""
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_score_cursor(last[2], last[3], last[0])
+    
+    return [_score_row_to_dict(row) for row in rows], next_cursor
+
+
+def fetch_score_stats() -> Dict[str, Any]:
+    """Totales de la tabla de scores en una sola consulta"""
+    query = """
+        SELECT
+            COUNT(*),
+            COUNT(DISTINCT PlayerName),
+            MAX(Score),
+            AVG(CAST(Score AS FLOAT)),
+            MIN(GameDate),
+            MAX(GameDate)
+        FROM dbo.SnakeScores
+    """
+    
+    with db_pool.connection() as db:
+        row = db.fetchone(query)
+    
+    total, players, best, average, first_game, last_game = row
+    return {
+        "total_scores": total,
+        "total_players": players,
+        "best_score": best,
+        "average_score": round(average, 2) if average is not None else None,
+        "first_game": _format_db_datetime(first_game) if first_game is not None else None,
+        "last_game": _format_db_datetime(last_game) if last_game is not None else None
+    }
+
+
+# ============================================================
+# Exportación de scores en streaming (NDJSON / CSV)
+# ============================================================
+
+EXPORT_COLUMNS = ["Id", "PlayerName", "Score", "GameDate", "CreatedAt"]
+
+
+def _build_export_query(
+    player_name: Optional[str],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+) -> Tuple[str, List[Any]]:
+    query = """
+        SELECT Id, PlayerName, Score, GameDate, CreatedAt
+        FROM dbo.SnakeScores
+        WHERE 1 = 1
+    """
+    params: List[Any] = []
+    if player_name is not None:
+        query += " AND PlayerName = ?"
+        params.append(player_name)
+    if date_from is not None:
+        query += " AND GameDate >= ?"
+        params.append(date_from)
+    if date_to is not None:
+        query += " AND GameDate < ?"
+        params.append(date_to)
+    query += " ORDER BY Id"
+    return query, params
+
+
+def _encode_export_rows(rows, fmt: str) -> bytes:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for row in rows:
+            writer.writerow([row[0], row[1], row[2], _format_db_datetime(row[3]), _format_db_datetime(row[4])])
+        return buffer.getvalue().encode("utf-8")
+    return b"".join(encode_json(_score_row_to_dict(row)) + b"\n" for row in rows)
+
+
+async def stream_snake_scores_export(query: str, params: List[Any], fmt: str, compress: bool):
+    """
+    Generador asíncrono que lee el resultado con cursor.fetchmany() en el
+    executor de BD y emite cada bloque en cuanto está listo. La memoria se
+    mantiene constante sin importar el número de filas.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def encode(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    # La conexión se entrega a través de `held`: si la petición se cancela
+    # mientras el acquire corre en el hilo, el finally o el propio hilo la devuelven
+    held_lock = threading.Lock()
+    held = {"pooled": None, "abandoned": False}
+
+    def acquire():
+        pooled = db_pool.acquire()
+        with held_lock:
+            if not held["abandoned"]:
+                held["pooled"] = pooled
+                return pooled
+        db_pool.release(pooled)
+        return None
+
+    # Cursor propio (no el caché de sentencias) para poder cerrarlo aunque queden filas
+    cursor = None
+    completed = False
+    row_count = 0
+    try:
+        pooled = await db_executor.run(acquire)
+
+        def open_cursor():
+            # Pasa por PooledConnection.execute: métricas de BD y spans de tracing
+            return pooled.execute(query, *params, cached=False)
+
+        cursor = await db_executor.run(open_cursor)
+        if fmt == "csv":
+            chunk = encode((",".join(EXPORT_COLUMNS) + "\n").encode("utf-8"))
+            if chunk:
+                yield chunk
+        
+        while True:
+            rows = await db_executor.run(pooled.fetchmany, cursor, EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            row_count += len(rows)
+            chunk = encode(_encode_export_rows(rows, fmt))
+            if chunk:
+                yield chunk
+        
+        if compressor:
+            yield compressor.flush()
+        completed = True
+    finally:
+        DB_ROWS_RETURNED.labels(query_label(query)).observe(row_count)
+        with held_lock:
+            held["abandoned"] = True
+            acquired = held["pooled"]
+
+        def cleanup():
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            db_pool.release(acquired, discard=not completed)
+
+        # Si el cliente se desconecta no se puede esperar aquí: se cierra en segundo plano
+        if acquired is not None:
+            asyncio.get_running_loop().run_in_executor(None, cleanup)
+
+
+# ============================================================
+# Caché del leaderboard (top K en memoria)
+# ============================================================
+
+class LeaderboardCache:
+    """
+    Top K scores en memoria, ordenados como la consulta SQL
+    (Score DESC, GameDate DESC). Cualquier `limit <= K` se responde sin ir a la BD.
+    - Los inserts se aplican incrementalmente (write-through)
+    - Se resincroniza desde la BD cuando pasa el TTL
+    """
+
+    def __init__(self, size: int = LEADERBOARD_CACHE_SIZE, ttl: float = LEADERBOARD_CACHE_TTL):
+        self.size = max(0, size)
+        self.ttl = ttl
+        self.refresh_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._loaded_at: Optional[float] = None
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "inserts": 0}
+
+    @staticmethod
+    def _sort_key(row: Dict[str, Any]):
+        return (row["Score"], row["GameDate"], row["Id"])
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def covers(self, limit: int) -> bool:
+        """Indica si un `limit` puede servirse desde la caché"""
+        return 0 <= limit <= self.size
+
+    def get(self, limit: int, record: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Top `limit` desde memoria, o None si hay que ir a la BD.
+        `record=False` no cuenta hit/miss (relecturas de la misma petición).
+        """
+        with self._lock:
+            if not self.covers(limit) or not self._is_fresh():
+                if record:
+                    self._stats["misses"] += 1
+                return None
+            if record:
+                self._stats["hits"] += 1
+            return self._rows[:limit]
+
+    def begin_refresh(self):
+        """Empezar a registrar inserts que ocurran mientras se lee la BD"""
+        with self._lock:
+            self._pending = []
+
+    def abort_refresh(self):
+        with self._lock:
+            self._pending = None
+
+    def load(self, rows: List[Dict[str, Any]]):
+        """Reemplazar el contenido con el top K leído de la BD"""
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            self._rows = list(rows[:self.size])
+            self._loaded_at = time.monotonic()
+            self._stats["refreshes"] += 1
+            known = {row["Id"] for row in self._rows}
+            for row in pending:
+                if row["Id"] not in known:
+                    self._insert(row)
+
+    def add(self, row: Dict[str, Any]):
+        """Aplicar un score recién insertado si entra en el top K"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(row)
+            if self._loaded_at is not None:
+                self._insert(row)
+
+    def _insert(self, row: Dict[str, Any]):
+        rows = self._rows
+        key = self._sort_key(row)
+        if self.size == 0:
+            return
+        # Si la caché no está llena, contiene toda la tabla y cualquier score entra
+        if len(rows) >= self.size and key <= self._sort_key(rows[-1]):
+            return
+        # Búsqueda binaria sobre la lista en orden descendente
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._sort_key(rows[mid]) > key:
+                lo = mid + 1
+            else:
+                hi = mid
+        rows.insert(lo, row)
+        if len(rows) > self.size:
+            rows.pop()
+        self._stats["inserts"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "rows": len(self._rows),
+                "ttl": self.ttl,
+                "age": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+                **self._stats,
+            }
+
+
+leaderboard_cache = LeaderboardCache()
+
+
+async def read_leaderboard(
+    cache: LeaderboardCache, limit: int, fetch, *args, lookup: bool = True
+) -> List[Dict[str, Any]]:
     """
-    Obtener todos los scores de un jugador específico
+    Top N desde una LeaderboardCache; la resincroniza con `fetch(K, *args)`
+    si está vencida. Si `limit` es mayor que K se consulta directamente.
+    `lookup=False` cuando el llamador ya consultó la caché y falló.
     """
-    try:
-        conn_string = get_db_connection_string()
-        conn = pyodbc.connect(conn_string)
-        cursor = conn.cursor()
-        
-        # Obtener los scores del jugador
-        query = """
-            SELECT 
-                Id,
-                PlayerName,
-                Score,
-                FORMAT(GameDate, 'yyyy-MM-dd HH:mm:ss') as GameDate,
-                FORMAT(CreatedAt, 'yyyy-MM-dd HH:mm:ss') as CreatedAt
+    if lookup:
+        cached = cache.get(limit)
+        if cached is not None:
+            return cached
+    if not cache.covers(limit):
+        return await db_executor.run(fetch, limit, *args)
+    
+    # Una sola resincronización a la vez; el resto espera y lee de memoria
+    async with cache.refresh_lock:
+        cached = cache.get(limit, record=False)
+        if cached is not None:
+            return cached
+        cache.begin_refresh()
+        try:
+            rows = await db_executor.run(fetch, cache.size, *args)
+        except Exception:
+            cache.abort_refresh()
+            raise
+        cache.load(rows)
+        return rows[:limit]
+
+
+def cached_leaderboard(limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Top N desde la réplica de lectura o la caché, o None si hay que ir a la BD"""
+    rows = score_replica.top_scores(limit)
+    if rows is not None:
+        return rows
+    return leaderboard_cache.get(limit)
+
+
+async def get_leaderboard(limit: int, cached: Optional[List[Dict[str, Any]]] = None,
+                          lookup: bool = True) -> List[Dict[str, Any]]:
+    """
+    Top N de todos los tiempos (desde la réplica de lectura si está al día).
+    Los handlers consultan `cached_leaderboard` una vez para decidir la
+    admisión y pasan aquí el resultado (`cached`, `lookup=False`).
+    """
+    if lookup:
+        cached = cached_leaderboard(limit)
+    if cached is not None:
+        return cached
+    return await read_leaderboard(leaderboard_cache, limit, fetch_top_scores, lookup=False)
+
+
+# ============================================================
+# Leaderboards por ventana de tiempo (diario / semanal / mensual)
+# ============================================================
+
+LEADERBOARD_PERIODS = ("daily", "weekly", "monthly")
+
+
+def window_bounds(period: str, moment: datetime) -> Tuple[datetime, datetime]:
+    """Inicio (inclusivo) y fin (exclusivo) de la ventana que contiene `moment`"""
+    day = datetime(moment.year, moment.month, moment.day)
+    if period == "daily":
+        return day, day + timedelta(days=1)
+    if period == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == "monthly":
+        start = day.replace(day=1)
+        if start.month == 12:
+            return start, start.replace(year=start.year + 1, month=1)
+        return start, start.replace(month=start.month + 1)
+    raise ValueError(f"Unknown leaderboard period: {period}")
+
+
+def _parse_game_date(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+class WindowedLeaderboard:
+    """
+    Top K de la ventana actual de un periodo. Los inserts se aplican
+    incrementalmente; al cruzar el límite de la ventana se empieza una nueva
+    (que se carga desde la BD en la primera lectura).
+    """
+
+    def __init__(self, period: str, size: int, ttl: float):
+        self.period = period
+        self.size = size
+        self.ttl = ttl
+        self.window_start, self.window_end = window_bounds(period, datetime.now())
+        self.cache = LeaderboardCache(size, ttl)
+
+    def roll_if_needed(self, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+        """Pasar a la ventana siguiente si corresponde; devuelve la ventana cerrada"""
+        now = now or datetime.now()
+        if now < self.window_end:
+            return None
+        closed = (self.window_start, self.window_end)
+        self.window_start, self.window_end = window_bounds(self.period, now)
+        self.cache = LeaderboardCache(self.size, self.ttl)
+        logger.info(f"Leaderboard {self.period} rolled over to {self.window_start:%Y-%m-%d}")
+        return closed
+
+    def add(self, row: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+        game_date = _parse_game_date(row["GameDate"])
+        closed = self.roll_if_needed(game_date)
+        if self.window_start <= game_date < self.window_end:
+            self.cache.add(row)
+        return closed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_start": self.window_start.isoformat(),
+            "window_end": self.window_end.isoformat(),
+            **self.cache.stats(),
+        }
+
+
+windowed_leaderboards: Dict[str, WindowedLeaderboard] = {
+    period: WindowedLeaderboard(period, LEADERBOARD_WINDOW_SIZE, LEADERBOARD_CACHE_TTL)
+    for period in LEADERBOARD_PERIODS
+}
+
+
+def fetch_window_top_scores(limit: int, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Top N de una ventana, leído de dbo.SnakeScores"""
+    query = """
+        SELECT TOP (?) 
+            Id,
+            PlayerName,
+            Score,
+            GameDate,
+            CreatedAt
+        FROM dbo.SnakeScores
+        WHERE GameDate >= ? AND GameDate < ?
+        ORDER BY Score DESC, GameDate DESC
+    """
+    
+    with db_pool.connection() as db:
+        rows = db.fetchall(query, limit, start, end)
+    
+    return [_score_row_to_dict(row) for row in rows]
+
+
+def fetch_window_summary(limit: int, period: str, start: datetime) -> List[Dict[str, Any]]:
+    """Top N de una ventana cerrada, leído de la tabla resumen dbo.SnakeScoresWindowTop"""
+    query = """
+        SELECT TOP (?) 
+            ScoreId as Id,
+            PlayerName,
+            Score,
+            GameDate,
+            CreatedAt
+        FROM dbo.SnakeScoresWindowTop
+        WHERE Period = ? AND WindowStart = ?
+        ORDER BY Score DESC, GameDate DESC
+    """
+    
+    with db_pool.connection() as db:
+        rows = db.fetchall(query, limit, period, start.date())
+    
+    return [_score_row_to_dict(row) for row in rows]
+
+
+def materialize_window_summary(period: str, start: datetime, end: datetime, size: int):
+    """Guardar el top K de una ventana cerrada en dbo.SnakeScoresWindowTop (idempotente)"""
+    with db_pool.connection() as db:
+        db.execute(
+            "DELETE FROM dbo.SnakeScoresWindowTop WHERE Period = ? AND WindowStart = ?;",
+            period, start.date()
+        )
+        db.execute("""
+            INSERT INTO dbo.SnakeScoresWindowTop
+                (Period, WindowStart, ScoreId, PlayerName, Score, GameDate, CreatedAt)
+            SELECT TOP (?) ?, ?, Id, PlayerName, Score, GameDate, CreatedAt
             FROM dbo.SnakeScores
-            WHERE PlayerName = ?
-            ORDER BY Score DESC, GameDate DESC
+            WHERE GameDate >= ? AND GameDate < ?
+            ORDER BY Score DESC, GameDate DESC;
+        """, size, period, start.date(), start, end)
+        db.commit()
+
+
+def _materialize_in_background(period: str, closed: Optional[Tuple[datetime, datetime]]):
+    if closed is None or not LEADERBOARD_WINDOW_SUMMARY:
+        return
+    start, end = closed
+    task = asyncio.create_task(
+        db_executor.run(materialize_window_summary, period, start, end, LEADERBOARD_WINDOW_SIZE),
+        name=f"materialize_{period}_{start:%Y%m%d}"
+    )
+    task.add_done_callback(_log_background_failure)
+
+
+async def get_windowed_leaderboard(
+    period: str,
+    limit: int,
+    start: Optional[datetime] = None,
+    cached: Optional[List[Dict[str, Any]]] = None,
+    lookup: bool = True
+) -> Dict[str, Any]:
+    """
+    Top N de la ventana actual (desde memoria) o de una ventana pasada
+    (desde la tabla resumen si está habilitada, si no desde dbo.SnakeScores).
+    `cached`/`lookup=False`: el llamador ya consultó la caché de la ventana actual.
+    """
+    leaderboard = windowed_leaderboards[period]
+    closed = leaderboard.roll_if_needed()
+    _materialize_in_background(period, closed)
+    if closed is not None:
+        # Lo leído antes del cambio de ventana pertenece a la ventana cerrada
+        cached, lookup = None, True
+    
+    if start is not None:
+        window_start, window_end = window_bounds(period, start)
+    else:
+        window_start, window_end = leaderboard.window_start, leaderboard.window_end
+    
+    if window_start == leaderboard.window_start and cached is not None:
+        scores = cached
+    elif window_start == leaderboard.window_start:
+        scores = await read_leaderboard(
+            leaderboard.cache, limit, fetch_window_top_scores, window_start, window_end,
+            lookup=lookup
+        )
+    elif LEADERBOARD_WINDOW_SUMMARY and window_end <= leaderboard.window_start:
+        scores = await db_executor.run(fetch_window_summary, limit, period, window_start)
+    else:
+        scores = await db_executor.run(fetch_window_top_scores, limit, window_start, window_end)
+    
+    return {
+        "period": period,
+        "window_start": window_start.isoformat(),
+        "window_end": window_end.isoformat(),
+        "scores": scores
+    }
+
+
+# ============================================================
+# Ranking de jugadores (árbol de Fenwick sobre los scores)
+# ============================================================
+
+class FenwickTree:
+    """Árbol de Fenwick (Binary Indexed Tree): sumas de prefijo en O(log n)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_counts(cls, counts: List[int]) -> "FenwickTree":
+        """Construir el árbol a partir de los valores por posición en O(n)"""
+        tree = cls(len(counts))
+        data = tree._tree
+        for i, count in enumerate(counts, start=1):
+            data[i] += count
+            parent = i + (i & -i)
+            if parent <= tree.size:
+                data[parent] += data[i]
+        return tree
+
+    def add(self, index: int, delta: int):
+        i = index + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, index: int) -> int:
+        """Suma de los elementos 0..index (inclusive)"""
+        i = min(index, self.size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+
+class PlayerRanking:
+    """
+    Mejor score de cada jugador y un árbol de Fenwick fijo indexado por
+    score en [0, SCORE_MAX_VALUE] para calcular posición y percentil en
+    O(log n), sin COUNT(*) en la BD. Cada insert es O(log n) (sin
+    reconstruir el árbol); la memoria es fija (una entrada por valor).
+    Los nombres se comparan sin distinguir mayúsculas ni espacios finales,
+    igual que la collation de SQL Server.
+    """
+
+    def __init__(self, resync_interval: float = RANKING_RESYNC_INTERVAL, max_score: int = SCORE_MAX_VALUE):
+        self.resync_interval = resync_interval
+        self.max_score = max(0, max_score)
+        self.refresh_lock = asyncio.Lock()
+        self._lock = threading.Lock()
+        self._best: Dict[str, int] = {}
+        # Jugadores por mejor score (solo para las métricas de scores distintos)
+        self._counts: Dict[int, int] = {}
+        self._tree = FenwickTree(self.max_score + 1)
+        self._loaded_at: Optional[float] = None
+        self._pending: Optional[List[Tuple[str, int]]] = None
+
+    @staticmethod
+    def _key(player_name: str) -> str:
+        return player_name.rstrip().casefold()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.resync_interval
+
+    def _clamp(self, score: int) -> int:
+        """Scores históricos fuera de rango se cuentan en el extremo más cercano"""
+        return min(max(0, score), self.max_score)
+
+    def build(self, best_scores: List[Tuple[str, int]]) -> Tuple[Dict[str, int], Dict[int, int], FenwickTree]:
+        """
+        Mejor score por jugador, conteos y árbol construidos en O(n) a partir
+        de las filas de la BD. No toca el estado: se llama desde el executor
+        para no bloquear el event loop y luego se instala con `load`.
+        """
+        best: Dict[str, int] = {}
+        for player_name, score in best_scores:
+            key = self._key(player_name)
+            best[key] = max(self._clamp(score), best.get(key, 0))
+        counts: Dict[int, int] = {}
+        for score in best.values():
+            counts[score] = counts.get(score, 0) + 1
+        per_score = [0] * (self.max_score + 1)
+        for score, count in counts.items():
+            per_score[score] = count
+        return best, counts, FenwickTree.from_counts(per_score)
+
+    def _record(self, key: str, score: int):
+        score = self._clamp(score)
+        previous = self._best.get(key)
+        if previous is not None and previous >= score:
+            return
+        self._best[key] = score
+        if previous is not None:
+            self._tree.add(previous, -1)
+            remaining = self._counts[previous] - 1
+            if remaining:
+                self._counts[previous] = remaining
+            else:
+                del self._counts[previous]
+        self._tree.add(score, 1)
+        self._counts[score] = self._counts.get(score, 0) + 1
+
+    def begin_refresh(self):
+        with self._lock:
+            self._pending = []
+
+    def abort_refresh(self):
+        with self._lock:
+            self._pending = None
+
+    def load(self, snapshot: Tuple[Dict[str, int], Dict[int, int], FenwickTree]):
+        """Instalar un estado construido con `build` y aplicar los inserts ocurridos mientras tanto"""
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            self._best, self._counts, self._tree = snapshot
+            for key, score in pending:
+                self._record(key, score)
+            self._loaded_at = time.monotonic()
+
+    def record(self, player_name: str, score: int):
+        """Aplicar un score recién insertado"""
+        key = self._key(player_name)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((key, score))
+            if self._loaded_at is not None:
+                self._record(key, score)
+
+    def rank_of_score(self, score: int) -> Dict[str, Any]:
+        """Posición que ocupa un score entre los mejores scores de todos los jugadores"""
+        with self._lock:
+            total = len(self._best)
+            # Jugadores con mejor score <= score: prefijo hasta `score`
+            better = total - self._tree.prefix_sum(self._clamp(score))
+        rank = better + 1
+        return {
+            "rank": rank,
+            "total_players": max(total, rank),
+            "percentile": round(rank / max(total, rank) * 100, 2)
+        }
+
+    def player_rank(self, player_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            best = self._best.get(self._key(player_name))
+        if best is None:
+            return None
+        return {"best_score": best, **self.rank_of_score(best)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "players": len(self._best),
+                "distinct_scores": len(self._counts),
+                "age": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+            }
+
+
+player_ranking = PlayerRanking()
+
+
+def fetch_player_best_scores() -> List[Tuple[str, int]]:
+    """Mejor score de cada jugador"""
+    query = """
+        SELECT PlayerName, MAX(Score) AS BestScore
+        FROM dbo.SnakeScores
+        GROUP BY PlayerName
+    """
+    
+    with db_pool.connection() as db:
+        rows = db.fetchall(query)
+    
+    return [(row[0], int(row[1])) for row in rows]
+
+
+def build_player_ranking_snapshot():
+    """Leer los mejores scores y construir el árbol (en el executor, fuera del event loop)"""
+    return player_ranking.build(fetch_player_best_scores())
+
+
+async def refresh_player_ranking():
+    """Recargar el ranking desde la BD (una sola recarga a la vez)"""
+    async with player_ranking.refresh_lock:
+        if not player_ranking.is_stale():
+            return
+        player_ranking.begin_refresh()
+        try:
+            snapshot = await db_executor.run(build_player_ranking_snapshot)
+        except Exception:
+            player_ranking.abort_refresh()
+            raise
+        player_ranking.load(snapshot)
+        logger.info(f"Player ranking loaded ({len(snapshot[0])} players)")
+
+
+def _log_background_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background task {task.get_name()} failed: {task.exception()}")
+
+
+def _refresh_player_ranking_in_background():
+    if player_ranking.refresh_lock.locked():
+        return
+    task = asyncio.create_task(refresh_player_ranking(), name="refresh_player_ranking")
+    task.add_done_callback(_log_background_failure)
+
+
+async def get_player_ranking() -> PlayerRanking:
+    """Ranking listo para consultar; si está vencido se recarga en segundo plano"""
+    if not player_ranking.loaded:
+        await refresh_player_ranking()
+    elif player_ranking.is_stale():
+        _refresh_player_ranking_in_background()
+    return player_ranking
+
+
+SCORES_CACHE_CONTROL = (
+    f"public, max-age={SCORES_CACHE_MAX_AGE}, "
+    f"stale-while-revalidate={SCORES_CACHE_STALE_WHILE_REVALIDATE}"
+)
+
+
+def scores_json_response(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Respuesta JSON de scores con un ETag fuerte calculado sobre el cuerpo
+    servido: cualquier cambio en los datos (de este proceso, de otra
+    instancia o de un escritor externo) cambia el ETag.
+    Responde 304 si If-None-Match trae ese mismo ETag.
+    """
+    response = FastJSONResponse(content, headers={"Cache-Control": SCORES_CACHE_CONTROL, **(headers or {})})
+    etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    response.headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": SCORES_CACHE_CONTROL})
+    return response
+
+
+def publish_new_scores(rows: List[Dict[str, Any]]):
+    """Aplicar scores recién insertados a las estructuras en memoria"""
+    for row in rows:
+        leaderboard_cache.add(row)
+        player_ranking.record(row["PlayerName"], row["Score"])
+        for period, leaderboard in windowed_leaderboards.items():
+            _materialize_in_background(period, leaderboard.add(row))
+    
+    # Aviso a los clientes MCP con un stream abierto (GET /mcp)
+    if rows:
+        mcp_result_cache.invalidate()
+        mcp_server_events.publish("notifications/message", {
+            "level": "info",
+            "logger": "snake-scores",
+            "data": {
+                "event": "scores_inserted",
+                "count": len(rows),
+                "top_score": max(row["Score"] for row in rows)
+            }
+        })
+
+
+# ============================================================
+# Réplica de lectura en memoria de dbo.SnakeScores
+# ============================================================
+
+class ScoreReplica:
+    """
+    Copia en memoria de dbo.SnakeScores para las lecturas de top y player.
+    La tabla solo recibe inserts, así que se mantiene al día leyendo
+    `Id > último Id visto` (un seek sobre la PK IDENTITY). Cada fila se
+    guarda una vez como (Score, GameDate, Id, PlayerName, CreatedAt) y se
+    indexa en dos listas ordenadas: global y por jugador.
+    - Solo responde si se sincronizó hace menos de `max_staleness` segundos;
+      si no, las lecturas van a la BD.
+    - Los inserts de este proceso se aplican al confirmarse (cada cliente
+      lee sus propias escrituras); el sondeo después solo los salta.
+    - Los Ids saltados quedan pendientes `gap_ttl` segundos, por si una
+      transacción con un Id menor confirma más tarde.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = READ_REPLICA_POLL_INTERVAL,
+        max_staleness: float = READ_REPLICA_MAX_STALENESS,
+        batch_size: int = READ_REPLICA_BATCH_SIZE,
+        max_rows: int = READ_REPLICA_MAX_ROWS,
+        gap_ttl: float = 30.0,
+        max_gap: int = 1000,
+    ):
+        self.poll_interval = poll_interval
+        self.max_staleness = max_staleness
+        self.batch_size = max(1, batch_size)
+        self.max_rows = max_rows
+        self.gap_ttl = gap_ttl
+        self.max_gap = max_gap
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._rows: List[Tuple[Any, ...]] = []
+        self._players: Dict[str, List[Tuple[Any, ...]]] = {}
+        self._last_id = 0
+        self._gaps: Dict[int, float] = {}
+        # Ids insertados por este proceso que el sondeo todavía no leyó
+        self._local_ids: set = set()
+        self._synced_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"polls": 0, "poll_errors": 0, "rows_applied": 0, "hits": 0, "fallbacks": 0}
+
+    @staticmethod
+    def _key(player_name: str) -> str:
+        return player_name.rstrip().casefold()
+
+    @staticmethod
+    def _entry(row) -> Tuple[Any, ...]:
+        """Fila (Id, PlayerName, Score, GameDate, CreatedAt) -> entrada ordenable"""
+        return (row[2], row[3], row[0], row[1], row[4])
+
+    @staticmethod
+    def _as_row(entry: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        """Entrada -> fila en el orden de columnas de las consultas"""
+        return (entry[2], entry[3], entry[0], entry[1], entry[4])
+
+    def is_fresh(self) -> bool:
+        return (
+            self.enabled
+            and self._synced_at is not None
+            and time.monotonic() - self._synced_at <= self.max_staleness
+        )
+
+    def _serving(self) -> bool:
+        if self.is_fresh():
+            self._stats["hits"] += 1
+            return True
+        if self.enabled:
+            self._stats["fallbacks"] += 1
+        return False
+
+    def top_scores(self, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Top `limit` desde la réplica, o None si hay que ir a la BD"""
+        if limit <= 0 or not self._serving():
+            return None
+        with self._lock:
+            entries = self._rows[-limit:]
+        return [_score_row_to_dict(self._as_row(entry)) for entry in reversed(entries)]
+
+    def player_rows(self, player_name: str, count: int, after: Optional[Tuple[int, Any, int]] = None):
+        """
+        Hasta `count` filas del jugador en orden (Score, GameDate, Id) DESC,
+        posteriores al cursor `after`; None si hay que ir a la BD.
         """
+        # Un cursor con fecha no ISO no se puede comparar en memoria
+        if after is not None and not isinstance(after[1], datetime):
+            return None
+        if not self._serving():
+            return None
+        with self._lock:
+            entries = self._players.get(self._key(player_name), [])
+            end = bisect_left(entries, after) if after is not None else len(entries)
+            selected = entries[max(0, end - count):end]
+        return [self._as_row(entry) for entry in reversed(selected)]
+
+    def _insert(self, row):
+        entry = self._entry(row)
+        insort(self._rows, entry)
+        insort(self._players.setdefault(self._key(entry[3]), []), entry)
+
+    def record_inserted(self, rows: List[Tuple[Any, ...]]):
+        """Aplicar filas (Id, PlayerName, Score, GameDate, CreatedAt) recién confirmadas por este proceso"""
+        if not self.enabled or self._synced_at is None:
+            return
+        with self._lock:
+            for row in rows:
+                score_id = row[0]
+                if score_id <= self._last_id:
+                    # Solo faltaba si era un Id pendiente; si no, el sondeo ya la trajo
+                    if self._gaps.pop(score_id, None) is None:
+                        continue
+                else:
+                    self._local_ids.add(score_id)
+                self._insert(row)
+
+    def _load(self, rows: List[Any]):
+        """Carga inicial: ordenar una vez y reemplazar el contenido"""
+        entries = sorted(self._entry(row) for row in rows)
+        players: Dict[str, List[Tuple[Any, ...]]] = {}
+        for entry in entries:
+            players.setdefault(self._key(entry[3]), []).append(entry)
+        with self._lock:
+            self._rows = entries
+            self._players = players
+            self._last_id = max((entry[2] for entry in entries), default=0)
+            self._gaps = {}
+            self._local_ids = set()
+
+    def _apply(self, rows: List[Any], now: float) -> int:
+        """Incorporar filas nuevas (o Ids pendientes que confirmaron tarde)"""
+        applied = 0
+        with self._lock:
+            for row in rows:
+                score_id = row[0]
+                local = score_id in self._local_ids
+                if local:
+                    self._local_ids.discard(score_id)
+                if score_id <= self._last_id:
+                    if self._gaps.pop(score_id, None) is None or local:
+                        continue
+                else:
+                    if score_id - self._last_id - 1 <= self.max_gap:
+                        for missing in range(self._last_id + 1, score_id):
+                            if missing not in self._local_ids:
+                                self._gaps[missing] = now
+                    self._last_id = score_id
+                    if local:
+                        continue
+                self._insert(row)
+                applied += 1
+            for missing in [score_id for score_id, seen in self._gaps.items() if now - seen > self.gap_ttl]:
+                del self._gaps[missing]
+        return applied
+
+    def _disable(self, reason: str):
+        logger.warning(f"Read replica disabled: {reason}")
+        self.enabled = False
+        with self._lock:
+            self._rows = []
+            self._players = {}
+            self._local_ids = set()
+
+    def sync_once(self):
+        """Leer e incorporar las filas nuevas (bloqueante: corre en el executor de BD)"""
+        started = time.monotonic()
+        initial = self._synced_at is None
+        with self._lock:
+            after_id = (min(self._gaps) - 1) if self._gaps else self._last_id
         
-        cursor.execute(query, player_name)
-        rows = cursor.fetchall()
+        fetched: List[Any] = []
+        while True:
+            rows = fetch_scores_since(after_id, self.batch_size)
+            if initial:
+                fetched.extend(rows)
+                if len(fetched) > self.max_rows:
+                    self._disable(f"more than {self.max_rows} rows (READ_REPLICA_MAX_ROWS)")
+                    return
+            else:
+                self._stats["rows_applied"] += self._apply(rows, started)
+            if len(rows) < self.batch_size:
+                break
+            after_id = rows[-1][0]
         
-        scores = []
-        for row in rows:
-            scores.append({
-                "Id": row.Id,
-                "PlayerName": row.PlayerName,
-                "Score": row.Score,
-                "GameDate": row.GameDate,
-                "CreatedAt": row.CreatedAt
-            })
+        if initial:
+            self._load(fetched)
+            self._stats["rows_applied"] += len(fetched)
+            logger.info(f"Read replica loaded ({len(fetched)} scores)")
+        elif len(self._rows) > self.max_rows:
+            self._disable(f"more than {self.max_rows} rows (READ_REPLICA_MAX_ROWS)")
+            return
+        self._stats["polls"] += 1
+        self._synced_at = started
+
+    async def _run(self):
+        while self.enabled:
+            try:
+                # Sin timeout: la carga inicial puede leer muchos lotes
+                await db_executor.run(self.sync_once, timeout=0)
+            except Exception as e:
+                self._stats["poll_errors"] += 1
+                logger.warning(f"Read replica sync failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.enabled = True
+            self._task = asyncio.create_task(self._run(), name="read_replica_sync")
+
+    async def stop(self):
+        self.enabled = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def lag(self) -> Optional[float]:
+        if self._synced_at is None:
+            return None
+        return time.monotonic() - self._synced_at
+
+    def stats(self) -> Dict[str, Any]:
+        lag = self.lag()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "fresh": self.is_fresh(),
+                "rows": len(self._rows),
+                "players": len(self._players),
+                "last_id": self._last_id,
+                "pending_gaps": len(self._gaps),
+                "lag_seconds": round(lag, 3) if lag is not None else None,
+                "max_staleness": self.max_staleness,
+                "local_unpolled": len(self._local_ids),
+                **self._stats,
+            }
+
+
+score_replica = ScoreReplica()
+
+
+def fetch_scores_since(last_id: int, limit: int) -> List[Any]:
+    """Hasta `limit` scores con Id > last_id, en orden de Id"""
+    query = """
+        SELECT TOP (?)
+            Id,
+            PlayerName,
+            Score,
+            GameDate,
+            CreatedAt
+        FROM dbo.SnakeScores
+        WHERE Id > ?
+        ORDER BY Id
+    """
+    
+    with db_pool.connection() as db:
+        return db.fetchall(query, limit, last_id)
+
+
+async def read_player_scores(
+    player_name: str,
+    page_size: int = PLAYER_SCORES_PAGE_SIZE,
+    after: Optional[Tuple[int, Any, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Página de scores de un jugador desde la réplica si está al día, si no desde la BD"""
+    rows = score_replica.player_rows(player_name, page_size + 1, after)
+    if rows is None:
+        return await db_executor.run(fetch_player_scores, player_name, page_size, after)
+    return _player_scores_page(rows, page_size)
+
+
+# ============================================================
+# Write-behind de scores (inserts agrupados en lotes)
+# ============================================================
+
+class ScoreWriteBehind:
+    """
+    Acumula los scores enviados en una cola en memoria y los inserta en lotes
+    (cada `interval_ms` o al llegar a `batch_size` filas) con una sola
+    transacción. Cada petición sigue recibiendo el Id asignado a su fila.
+    Si un lote falla por una fila inválida, sus filas se reintentan una a
+    una para que el error le llegue solo a la petición que lo causó.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = SCORE_WRITE_BEHIND_BATCH_SIZE,
+        interval_ms: float = SCORE_WRITE_BEHIND_INTERVAL_MS,
+        max_pending: int = SCORE_WRITE_BEHIND_MAX_PENDING,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.interval = max(0.0, interval_ms) / 1000
+        self.max_pending = max(1, max_pending)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"batches": 0, "rows": 0, "failed_batches": 0, "max_batch": 0, "row_retries": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Arrancar el proceso de flush en segundo plano (en el event loop actual)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, player_name: str, score: int) -> Optional[Dict[str, Any]]:
+        """Encolar un score y esperar a que su lote se guarde"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((player_name, score, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = loop.time() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                try:
+                    if remaining <= 0:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                except (asyncio.QueueEmpty, TimeoutError):
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch):
+        scores = [(player_name, score) for player_name, score, _ in batch]
+        try:
+            rows = await db_executor.run(insert_snake_scores_batch, scores)
+        except (DBExecutorSaturated, TimeoutError) as e:
+            # BD ocupada: reintentar fila a fila solo añadiría carga
+            self._stats["failed_batches"] += 1
+            logger.error(f"Write-behind flush of {len(batch)} scores failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            self._stats["failed_batches"] += 1
+            logger.error(f"Write-behind flush of {len(batch)} scores failed, retrying row by row: {e}")
+            await self._retry_rows(batch)
+            return
+        
+        self._stats["batches"] += 1
+        self._stats["rows"] += len(rows)
+        self._stats["max_batch"] = max(self._stats["max_batch"], len(rows))
+        for (_, _, future), row in zip(batch, rows):
+            if not future.done():
+                future.set_result(row)
+
+    async def _retry_rows(self, batch):
+        """Insertar cada fila de un lote fallido por separado"""
+        for player_name, score, future in batch:
+            self._stats["row_retries"] += 1
+            try:
+                row = await db_executor.run(insert_snake_score, player_name, score)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self._stats["rows"] += 1
+            if not future.done():
+                future.set_result(row)
+
+    async def stop(self):
+        """Guardar lo pendiente y detener el flush (hook de shutdown)"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Write-behind queue flushed")
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            "enabled": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size,
+            "interval_ms": self.interval * 1000,
+            "avg_batch": round(self._stats["rows"] / batches, 2) if batches else 0.0,
+            **self._stats,
+        }
+
+
+score_writer = ScoreWriteBehind()
+
+
+# ============================================================
+# Ingesta masiva de scores (JSON array / NDJSON)
+# ============================================================
+
+class BatchParseError(Exception):
+    """El cuerpo de la petición batch no es JSON válido"""
+
+
+async def _iter_ndjson(stream):
+    """Recorrer un stream NDJSON devolviendo (objeto, error) por cada línea no vacía"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line), None
+                except json.JSONDecodeError as e:
+                    yield None, f"Invalid JSON: {e.msg}"
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        try:
+            yield json.loads(buffer), None
+        except json.JSONDecodeError as e:
+            yield None, f"Invalid JSON: {e.msg}"
+
+
+async def _iter_json_array(stream):
+    """Recorrer un array JSON a medida que llegan los bytes, elemento a elemento"""
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    json_decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    finished = False
+    async for chunk in stream:
+        if finished:
+            continue
+        buffer += text_decoder.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise BatchParseError("Body must be a JSON array or NDJSON")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                break
+            try:
+                item, pos = json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Elemento incompleto: esperar más datos
+                break
+            yield item, None
+        buffer = buffer[pos:]
+    if not finished:
+        raise BatchParseError("Invalid JSON: unterminated array")
+
+
+async def ingest_snake_scores(records, chunk_size: int = BATCH_INSERT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Validar los registros a medida que llegan (SnakeScoreCreate: nombre de
+    1 a 100 caracteres, score en rango) e insertarlos en transacciones de
+    `chunk_size` filas. Devuelve el Id o el error de cada fila: si un bloque
+    falla igualmente, sus filas se reintentan una a una para que el error
+    quede solo en la fila que lo causó.
+    """
+    results: List[Dict[str, Any]] = []
+    chunk: List[Tuple[int, str, int]] = []
+    inserted = 0
+    failed = 0
+    parse_error = None
+
+    async def flush():
+        nonlocal inserted, failed
+        try:
+            rows = await db_executor.run(
+                insert_snake_scores_batch, [(name, score) for _, name, score in chunk]
+            )
+        except (DBExecutorSaturated, TimeoutError) as e:
+            failed += len(chunk)
+            for index, _, _ in chunk:
+                results.append({"index": index, "error": f"Insert failed: {str(e)}"})
+        except Exception:
+            for index, name, score in chunk:
+                try:
+                    row = await db_executor.run(insert_snake_score, name, score)
+                except Exception as e:
+                    failed += 1
+                    results.append({"index": index, "error": f"Insert failed: {str(e)}"})
+                    continue
+                inserted += 1
+                publish_new_scores([row])
+                results.append({"index": index, "id": row["Id"]})
+        else:
+            inserted += len(rows)
+            publish_new_scores(rows)
+            for (index, _, _), row in zip(chunk, rows):
+                results.append({"index": index, "id": row["Id"]})
+        chunk.clear()
+
+    index = 0
+    try:
+        async for record, error in records:
+            if index >= BATCH_MAX_ROWS:
+                parse_error = f"Too many rows (max {BATCH_MAX_ROWS})"
+                break
+            if error is None:
+                try:
+                    score = SnakeScoreCreate.model_validate(record)
+                except ValidationError as e:
+                    error = "; ".join(
+                        f"{'.'.join(str(loc) for loc in err['loc']) or 'body'}: {err['msg']}"
+                        for err in e.errors()
+                    )
+            if error is not None:
+                failed += 1
+                results.append({"index": index, "error": error})
+            else:
+                chunk.append((index, score.PlayerName, score.Score))
+                if len(chunk) >= chunk_size:
+                    await flush()
+            index += 1
+    except BatchParseError as e:
+        parse_error = str(e)
+    
+    if chunk:
+        await flush()
+    
+    results.sort(key=lambda result: result["index"])
+    response = {
+        "success": failed == 0 and parse_error is None,
+        "received": index,
+        "inserted": inserted,
+        "failed": failed,
+        "results": results
+    }
+    if parse_error:
+        response["error"] = parse_error
+    return response
+
+
+# ============================================================
+# Endpoints para Snake Scores
+# ============================================================
+
+@app.post("/api/snake-scores", response_model=dict)
+async def create_snake_score(score_data: SnakeScoreCreate):
+    """
+    Guardar un nuevo score del juego de la serpiente
+    """
+    async with admission.slot("create"):
+        try:
+            if score_writer.running:
+                new_row = await score_writer.submit(score_data.PlayerName, score_data.Score)
+            else:
+                new_row = await db_executor.run(insert_snake_score, score_data.PlayerName, score_data.Score)
+            rank = None
+            if new_row:
+                publish_new_scores([new_row])
+                if player_ranking.loaded:
+                    rank = player_ranking.rank_of_score(new_row["Score"])
+            
+            return {
+                "success": True,
+                "message": "Score guardado exitosamente",
+                "id": new_row["Id"] if new_row else None,
+                "rank": rank
+            }
+            
+        except DBExecutorSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers=RETRY_AFTER_HEADERS)
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Timeout al guardar el score")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al guardar el score: {str(e)}")
+
+
+@app.post("/api/snake-scores/batch", response_model=dict)
+async def create_snake_scores_batch(raw_request: Request):
+    """
+    Guardar muchos scores en una sola petición.
+    Acepta un array JSON o NDJSON (Content-Type: application/x-ndjson),
+    valida registro a registro e inserta en transacciones por bloques.
+    """
+    content_type = raw_request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        records = _iter_ndjson(raw_request.stream())
+    else:
+        records = _iter_json_array(raw_request.stream())
+    
+    async with admission.slot("batch"):
+        try:
+            result = await ingest_snake_scores(records)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al guardar los scores: {str(e)}")
+    
+    if result["received"] == 0 and result.get("error"):
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
+@app.get("/api/snake-scores/top/{limit}", response_model=List[SnakeScoreResponse])
+async def get_top_scores(request: Request, limit: int = PathParam(..., ge=1, le=TOP_SCORES_MAX_LIMIT)):
+    """
+    Obtener los mejores scores (top N).
+    Responde 304 si If-None-Match trae el ETag de los datos actuales.
+    """
+    # Si el top N está en caché o en la réplica no se consume hueco de admisión
+    cached = cached_leaderboard(limit)
+    async with admission.slot("top", bypass=cached is not None):
+        try:
+            return scores_json_response(request, await get_leaderboard(limit, cached, lookup=False))
+        
+        except DBExecutorSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers=RETRY_AFTER_HEADERS)
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Timeout al obtener los scores")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener los scores: {str(e)}")
+
+
+@app.get("/api/snake-scores/export")
+async def export_snake_scores(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    player: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    compress: bool = Query(False, alias="gzip")
+):
+    """
+    Exportar dbo.SnakeScores (o un rango de fechas / jugador) en streaming.
+    - format: ndjson o csv
+    - player, from, to: filtros opcionales (from inclusivo, to exclusivo)
+    - gzip: comprimir la respuesta (Content-Encoding: gzip)
+    """
+    query, params = _build_export_query(player, date_from, date_to)
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="snake_scores.{export_format}"'
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    
+    # El hueco se mantiene hasta que termina el stream
+    ticket = await admission.acquire("export")
+    return StreamingResponse(
+        admission.release_after(ticket, stream_snake_scores_export(query, params, export_format, compress)),
+        media_type=media_type,
+        headers=headers
+    )
+
+
+@app.get("/api/snake-scores/leaderboard/{period}")
+async def get_period_leaderboard(
+    period: str = PathParam(..., pattern="^(daily|weekly|monthly)$"),
+    limit: int = Query(10, ge=1, le=TOP_SCORES_MAX_LIMIT),
+    start: Optional[datetime] = None
+):
+    """
+    Leaderboard diario, semanal o mensual.
+    - start: cualquier fecha dentro de una ventana pasada (por defecto, la actual)
+    """
+    # La ventana actual en caché se sirve sin consumir hueco de admisión
+    window_cached = windowed_leaderboards[period].cache.get(limit) if start is None else None
+    async with admission.slot("leaderboard", bypass=window_cached is not None):
+        try:
+            return FastJSONResponse(await get_windowed_leaderboard(
+                period, limit, start, window_cached, lookup=start is not None
+            ))
         
-        cursor.close()
-        conn.close()
+        except DBExecutorSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers=RETRY_AFTER_HEADERS)
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Timeout al obtener el leaderboard")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener el leaderboard: {str(e)}")
+
+
+@app.get("/api/snake-scores/rank/{player_name}")
+async def get_player_rank(player_name: str):
+    """
+    Posición y percentil del mejor score de un jugador
+    (ej: "#1234 de 80000, top 2%")
+    """
+    # Con el ranking ya cargado se responde desde memoria
+    async with admission.slot("rank", bypass=player_ranking.loaded):
+        try:
+            ranking = await get_player_ranking()
         
-        return scores
+        except DBExecutorSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers=RETRY_AFTER_HEADERS)
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Timeout al obtener el ranking")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener el ranking: {str(e)}")
+    
+    rank = ranking.player_rank(player_name)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="Jugador no encontrado")
+    return {"PlayerName": player_name, **rank}
+
+
+@app.get("/api/snake-scores/player/{player_name}", response_model=List[SnakeScoreResponse])
+async def get_player_scores(
+    request: Request,
+    player_name: str,
+    limit: int = Query(PLAYER_SCORES_PAGE_SIZE, ge=1, le=PLAYER_SCORES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Obtener los scores de un jugador específico, paginados.
+    Si hay más resultados, el header X-Next-Cursor trae el cursor de la página siguiente.
+    Responde 304 si If-None-Match trae el ETag de los datos actuales.
+    """
+    try:
+        after = decode_score_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    async with admission.slot("player", bypass=score_replica.is_fresh()):
+        try:
+            scores, next_cursor = await read_player_scores(player_name, limit, after)
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener los scores del jugador: {str(e)}")
+        except DBExecutorSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers=RETRY_AFTER_HEADERS)
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="Timeout al obtener los scores del jugador")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener los scores del jugador: {str(e)}")
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return scores_json_response(request, scores, headers)
 
 
 @app.get("/{full_path:path}")
-async def serve_static_or_spa(full_path: str):
+async def serve_static_or_spa(full_path: str, request: Request):
     """
     Servir archivos estáticos o el SPA para rutas no encontradas.
     Esto permite que Angular maneje las rutas del frontend.
     """
+    if STATIC_MANIFEST:
+        asset = static_assets.get(full_path)
+        if asset is not None:
+            return static_assets.response(asset, request)
+        # Un asset que no existe es un 404, no la página del SPA
+        if full_path.startswith("assets/"):
+            raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        index_asset = static_assets.get("index.html")
+        if index_asset is not None:
+            return static_assets.response(index_asset, request)
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    
     # Intentar servir archivo estático
     file_path = WWW_DIR / full_path
     if file_path.is_file():
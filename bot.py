@@ -45,6 +45,8 @@ class MCPChatBot:
         self.conversation_active = True
         self.use_jsonrpc = use_jsonrpc
         self.jsonrpc_id = 0
+        # Conexión HTTP reutilizable; lleva la cabecera Mcp-Session-Id tras initialize
+        self.http = requests.Session()
         
         # Inicializar sistema
         self._setup_system()
@@ -95,7 +97,7 @@ class MCPChatBot:
                 }
             })
             
-            response = requests.post(
+            response = self.http.post(
                 FASTAPI_BASE_URL,
                 json=request,
                 timeout=5
@@ -104,6 +106,9 @@ class MCPChatBot:
             if response.status_code == 200:
                 data = response.json()
                 if "result" in data:
+                    session_id = response.headers.get("Mcp-Session-Id")
+                    if session_id:
+                        self.http.headers["Mcp-Session-Id"] = session_id
                     server_info = data["result"]
                     print(f"✅ Servidor MCP inicializado: {server_info.get('serverInfo', {}).get('name', 'Unknown')}")
                     print(f"   Versión del protocolo: {server_info.get('protocolVersion', 'Unknown')}")
@@ -115,13 +120,23 @@ class MCPChatBot:
         except Exception as e:
             print(f"⚠️  Error al inicializar servidor MCP: {e}")
     
+    def _close_mcp_session(self):
+        """Cerrar la sesión MCP en el servidor (si se abrió una)"""
+        if "Mcp-Session-Id" not in self.http.headers:
+            return
+        try:
+            self.http.delete(FASTAPI_BASE_URL, timeout=3)
+        except Exception:
+            pass
+        self.http.headers.pop("Mcp-Session-Id", None)
+    
     def _load_mcp_tools(self):
         """Cargar herramientas MCP desde el servidor"""
         try:
             if self.use_jsonrpc:
                 # Usar JSON-RPC 2.0
                 request = self._jsonrpc_request("tools/list")
-                response = requests.post(
+                response = self.http.post(
                     FASTAPI_BASE_URL,
                     json=request,
                     timeout=5
@@ -174,12 +189,22 @@ class MCPChatBot:
                     "arguments": arguments
                 })
                 
-                response = requests.post(
+                response = self.http.post(
                     FASTAPI_BASE_URL,
                     json=request,
                     timeout=10
                 )
                 
+                # Sesión caducada en el servidor: renegociar y reintentar una vez
+                if response.status_code == 404 and "Mcp-Session-Id" in self.http.headers:
+                    self.http.headers.pop("Mcp-Session-Id", None)
+                    self._initialize_mcp_server()
+                    response = self.http.post(
+                        FASTAPI_BASE_URL,
+                        json=request,
+                        timeout=10
+                    )
+                
                 if response.status_code == 200:
                     data = response.json()
                     if "result" in data:
@@ -362,6 +387,8 @@ class MCPChatBot:
                 break
             except Exception as e:
                 print(f"\n❌ Error: {e}")
+        
+        self._close_mcp_session()
     
     def _print_welcome(self):
         """Imprimir mensaje de bienvenida"""
@@ -298,7 +298,7 @@ export class HomePage implements OnInit, OnDestroy, AfterViewInit {
       next: (response) => {
         console.log('Score guardado:', response);
         this.showSuccessAlert(`¡Score guardado exitosamente, ${playerName}!`);
-        this.loadTopScores();
+        this.loadTopScores(true);
       },
       error: (error) => {
         console.error('Error al guardar el score:', error);
@@ -307,8 +307,8 @@ export class HomePage implements OnInit, OnDestroy, AfterViewInit {
     });
   }
 
-  loadTopScores() {
-    this.scoreService.getTopScores(10).subscribe({
+  loadTopScores(revalidate: boolean = false) {
+    this.scoreService.getTopScores(10, revalidate).subscribe({
       next: (scores) => {
         this.topScores = scores;
         console.log('Top scores cargados:', scores);
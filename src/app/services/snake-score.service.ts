@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpHeaders } from '@angular/common/http';
 import { Observable } from 'rxjs';
 
 export interface SnakeScore {
@@ -30,10 +30,13 @@ export class SnakeScoreService {
   }
 
   /**
-   * Obtener los mejores scores (top 10)
+   * Obtener los mejores scores (top 10).
+   * Con revalidate, el navegador no usa su caché sin preguntar al servidor
+   * (se responde 304 si el ranking no cambió)
    */
-  getTopScores(limit: number = 10): Observable<SnakeScore[]> {
-    return this.http.get<SnakeScore[]>(`${this.apiUrl}/top/${limit}`);
+  getTopScores(limit: number = 10, revalidate: boolean = false): Observable<SnakeScore[]> {
+    const headers = revalidate ? new HttpHeaders({ 'Cache-Control': 'no-cache' }) : undefined;
+    return this.http.get<SnakeScore[]>(`${this.apiUrl}/top/${limit}`, { headers });
   }
 
   /**
@@ -1,5 +1,7 @@
 -- ============================================================
 -- Tabla para guardar los scores del juego de la serpiente
+-- Solo para desarrollo: borra la tabla. En producción usar
+-- las migraciones de DB/migrations/ (python db.py --migrate)
 -- ============================================================
 
 -- Eliminar tabla si existe (para desarrollo)
@@ -0,0 +1,17 @@
+-- ============================================================
+-- Migración 0001: tabla SnakeScores (sin borrar datos existentes)
+-- ============================================================
+
+IF OBJECT_ID('dbo.SnakeScores', 'U') IS NULL
+    CREATE TABLE dbo.SnakeScores (
+        Id INT PRIMARY KEY IDENTITY(1,1),
+        PlayerName NVARCHAR(100) NOT NULL,
+        Score INT NOT NULL,
+        GameDate DATETIME NOT NULL DEFAULT GETDATE(),
+        CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SnakeScores_GameDate' AND object_id = OBJECT_ID('dbo.SnakeScores'))
+    CREATE INDEX IX_SnakeScores_GameDate ON dbo.SnakeScores(GameDate);
+GO
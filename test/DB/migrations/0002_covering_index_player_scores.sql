@@ -0,0 +1,11 @@
+-- ============================================================
+-- Migración 0002: índice cubriente para los scores de un jugador
+-- WHERE PlayerName = ? ORDER BY Score DESC, GameDate DESC, Id DESC
+-- (Id es la clave del índice clustered, así que ya va incluido)
+-- ============================================================
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SnakeScores_PlayerName_Score' AND object_id = OBJECT_ID('dbo.SnakeScores'))
+    CREATE INDEX IX_SnakeScores_PlayerName_Score
+        ON dbo.SnakeScores(PlayerName, Score DESC, GameDate DESC)
+        INCLUDE (CreatedAt);
+GO
@@ -0,0 +1,15 @@
+-- ============================================================
+-- Migración 0003: índice cubriente para el top N
+-- SELECT TOP (?) ... ORDER BY Score DESC, GameDate DESC sin key lookups.
+-- Reemplaza a IX_SnakeScores_Score, que queda redundante.
+-- ============================================================
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SnakeScores_Score_GameDate' AND object_id = OBJECT_ID('dbo.SnakeScores'))
+    CREATE INDEX IX_SnakeScores_Score_GameDate
+        ON dbo.SnakeScores(Score DESC, GameDate DESC)
+        INCLUDE (PlayerName, CreatedAt);
+GO
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SnakeScores_Score' AND object_id = OBJECT_ID('dbo.SnakeScores'))
+    DROP INDEX IX_SnakeScores_Score ON dbo.SnakeScores;
+GO
@@ -0,0 +1,67 @@
+-- ============================================================
+-- Migración 0004: tabla resumen de leaderboards por ventana (diario / semanal / mensual)
+-- Guarda el top K de cada ventana cerrada para no recorrer
+-- IX_SnakeScores_GameDate al consultar ventanas pasadas.
+-- Se puede reconstruir en cualquier momento desde dbo.SnakeScores.
+-- ============================================================
+
+-- Crear la tabla si no existe (no se elimina: conserva el histórico)
+IF OBJECT_ID('dbo.SnakeScoresWindowTop', 'U') IS NULL
+    CREATE TABLE dbo.SnakeScoresWindowTop (
+        Period VARCHAR(10) NOT NULL,
+        WindowStart DATE NOT NULL,
+        ScoreId INT NOT NULL,
+        PlayerName NVARCHAR(100) NOT NULL,
+        Score INT NOT NULL,
+        GameDate DATETIME NOT NULL,
+        CreatedAt DATETIME NOT NULL,
+        CONSTRAINT PK_SnakeScoresWindowTop PRIMARY KEY (Period, WindowStart, ScoreId)
+    );
+GO
+
+-- Procedimiento para reconstruir la tabla resumen desde dbo.SnakeScores
+-- (semanas de lunes a domingo; el día 0 de SQL Server, 1900-01-01, fue lunes)
+CREATE OR ALTER PROCEDURE dbo.RebuildSnakeScoresWindowTop
+    @TopK INT = 100
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    BEGIN TRANSACTION;
+
+    DELETE FROM dbo.SnakeScoresWindowTop;
+
+    WITH Windows AS (
+        SELECT 'daily' AS Period, CAST(GameDate AS DATE) AS WindowStart,
+               Id, PlayerName, Score, GameDate, CreatedAt
+        FROM dbo.SnakeScores
+        UNION ALL
+        SELECT 'weekly', DATEADD(DAY, -(DATEDIFF(DAY, 0, GameDate) % 7), CAST(GameDate AS DATE)),
+               Id, PlayerName, Score, GameDate, CreatedAt
+        FROM dbo.SnakeScores
+        UNION ALL
+        SELECT 'monthly', DATEFROMPARTS(YEAR(GameDate), MONTH(GameDate), 1),
+               Id, PlayerName, Score, GameDate, CreatedAt
+        FROM dbo.SnakeScores
+    ),
+    Ranked AS (
+        SELECT *,
+               ROW_NUMBER() OVER (
+                   PARTITION BY Period, WindowStart
+                   ORDER BY Score DESC, GameDate DESC
+               ) AS Position
+        FROM Windows
+    )
+    INSERT INTO dbo.SnakeScoresWindowTop
+        (Period, WindowStart, ScoreId, PlayerName, Score, GameDate, CreatedAt)
+    SELECT Period, WindowStart, Id, PlayerName, Score, GameDate, CreatedAt
+    FROM Ranked
+    WHERE Position <= @TopK;
+
+    COMMIT TRANSACTION;
+END;
+GO
+
+-- Reconstruir con los datos actuales
+EXEC dbo.RebuildSnakeScoresWindowTop @TopK = 100;
+GO
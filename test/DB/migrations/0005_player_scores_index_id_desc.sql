@@ -0,0 +1,18 @@
+-- ============================================================
+-- Migración 0005: Id DESC explícito en el índice de scores de un jugador
+-- fetch_player_scores y la paginación por keyset ordenan por
+-- Score DESC, GameDate DESC, Id DESC. En 0002 el Id solo entraba como
+-- clave implícita del índice clustered (ascendente): el índice no
+-- cubría ese ORDER BY y SQL Server ordenaba todas las filas del jugador.
+-- ============================================================
+
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_SnakeScores_PlayerName_Score' AND object_id = OBJECT_ID('dbo.SnakeScores'))
+    CREATE INDEX IX_SnakeScores_PlayerName_Score
+        ON dbo.SnakeScores(PlayerName, Score DESC, GameDate DESC, Id DESC)
+        INCLUDE (CreatedAt)
+        WITH (DROP_EXISTING = ON);
+ELSE
+    CREATE INDEX IX_SnakeScores_PlayerName_Score
+        ON dbo.SnakeScores(PlayerName, Score DESC, GameDate DESC, Id DESC)
+        INCLUDE (CreatedAt);
+GO
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de carga end-to-end de app/main.py sin Azure SQL.
+La app corre con pyodbc sustituido por SQLite (test/bench/sqlite_pyodbc.py,
+con latencia simulada por ida y vuelta), en proceso (ASGI directo, sin red)
+o bajo uvicorn en un subproceso. Se lanza una mezcla configurable de
+POST /api/snake-scores, /top/{limit}, /player/{name}, /mcp y estáticos con
+N clientes concurrentes y se reportan RPS y p50/p95/p99 por endpoint.
+Guardar un resultado con --save y compararlo con --compare sirve de línea
+base para cada cambio de rendimiento.
+Uso:
+  python test/bench/load.py --duration=20 --concurrency=32
+  python test/bench/load.py --server=uvicorn --latency-ms=5 --jitter-ms=5
+  python test/bench/load.py --mix=top=8,player=2 --save=baseline.json
+  python test/bench/load.py --compare=baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Permitir importar app.main y el sustituto de pyodbc desde la raíz del proyecto
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx
+
+import sqlite_pyodbc
+
+DEFAULT_MIX = "create=1,top=6,player=3,mcp=1,static=1"
+
+
+# ============================================================
+# Peticiones de la mezcla
+# ============================================================
+
+def request_create(rng: random.Random, players: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "POST", "/api/snake-scores", {
+        "json": {"PlayerName": f"Jugador {rng.randrange(players)}", "Score": rng.randint(0, 5000)}
+    }
+
+
+def request_top(rng: random.Random, players: int):
+    return "GET", f"/api/snake-scores/top/{rng.choice((10, 10, 10, 50))}", {}
+
+
+def request_player(rng: random.Random, players: int):
+    return "GET", f"/api/snake-scores/player/Jugador {rng.randrange(players)}", {}
+
+
+def request_mcp(rng: random.Random, players: int):
+    tool = rng.choice((
+        ("get_top_scores", {"limit": 10}),
+        ("get_player_scores", {"player_name": f"Jugador {rng.randrange(players)}"}),
+        ("get_score_stats", {})
+    ))
+    return "POST", "/mcp", {
+        "json": {
+            "jsonrpc": "2.0",
+            "id": rng.randrange(1_000_000),
+            "method": "tools/call",
+            "params": {"name": tool[0], "arguments": tool[1]}
+        },
+        "headers": {"Accept": "application/json"}
+    }
+
+
+def request_static(rng: random.Random, players: int):
+    return "GET", "/", {}
+
+
+REQUESTS = {
+    "create": request_create,
+    "top": request_top,
+    "player": request_player,
+    "mcp": request_mcp,
+    "static": request_static
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'create=1,top=6' -> {"create": 1.0, "top": 6.0}"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in REQUESTS:
+            raise argparse.ArgumentTypeError(f"Endpoint desconocido en --mix: {name} (válidos: {', '.join(REQUESTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ============================================================
+# Carga
+# ============================================================
+
+async def worker(client: httpx.AsyncClient, mix: Dict[str, float], players: int, deadline: float,
+                 results: Optional[Dict[str, List[Tuple[float, int]]]], seed: int):
+    """Un cliente: petición tras petición hasta `deadline` (sin think time)"""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, kwargs = REQUESTS[name](rng, players)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        if results is not None:
+            results[name].append((time.perf_counter() - started, status))
+
+
+async def drive(client: httpx.AsyncClient, args) -> Tuple[Dict[str, List[Tuple[float, int]]], float]:
+    """Calentamiento (descartado) y medición con `args.concurrency` clientes"""
+    if args.warmup > 0:
+        deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(
+            worker(client, args.mix, args.players, deadline, None, args.seed + i)
+            for i in range(args.concurrency)
+        ))
+
+    results = {name: [] for name in args.mix}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        worker(client, args.mix, args.players, deadline, results, args.seed + 1000 + i)
+        for i in range(args.concurrency)
+    ))
+    return results, time.perf_counter() - started
+
+
+def summarize(samples: List[Tuple[float, int]], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    errors = sum(1 for _, status in samples if status == 0 or status >= 400)
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": None,
+        "p95_ms": None,
+        "p99_ms": None
+    }
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary.update(p50_ms=round(cuts[49], 3), p95_ms=round(cuts[94], 3), p99_ms=round(cuts[98], 3))
+    elif latencies:
+        summary.update(p50_ms=round(latencies[0], 3), p95_ms=round(latencies[0], 3), p99_ms=round(latencies[0], 3))
+    return summary
+
+
+def status_counts(samples: List[Tuple[float, int]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for _, status in samples:
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    return counts
+
+
+# ============================================================
+# Servidores
+# ============================================================
+
+def configure_environment(args):
+    """Variables de la app comunes a los dos modos (antes de importar app.main)"""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("HOST_DB", "sqlite-bench")
+    sqlite_pyodbc.configure(
+        args.db,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        connect_latency_ms=args.connect_latency_ms
+    )
+    sqlite_pyodbc.install()
+
+
+async def run_inprocess(args):
+    """App en este proceso vía ASGI: mide la app sin red (el cliente comparte el event loop)"""
+    configure_environment(args)
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive(client, args)
+
+
+def serve(args):
+    """Modo interno de --server=uvicorn: el subproceso que sirve la app"""
+    import uvicorn
+
+    configure_environment(args)
+    from app.main import app
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+def server_command(args) -> List[str]:
+    return [
+        sys.executable, str(Path(__file__).resolve()), "--serve",
+        f"--port={args.port}",
+        f"--db={args.db}",
+        f"--latency-ms={args.latency_ms}",
+        f"--jitter-ms={args.jitter_ms}",
+        f"--connect-latency-ms={args.connect_latency_ms}"
+    ]
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn terminó al arrancar (código {process.returncode})")
+        try:
+            if (await client.get("/health/live")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn no respondió a tiempo")
+
+
+async def run_uvicorn(args):
+    """App bajo uvicorn en un subproceso: incluye HTTP real y un proceso propio para el servidor"""
+    process = subprocess.Popen(server_command(args), cwd=str(BASE_DIR))
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=30) as client:
+            await wait_until_ready(client, process)
+            return await drive(client, args)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ============================================================
+# Reporte y comparación con la línea base
+# ============================================================
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'Endpoint':<10} | {'Peticiones':>10} | {'Errores':>7} | {'RPS':>8} | "
+          f"{'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9}")
+    print("-" * 80)
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, summary in rows:
+        if name == "TOTAL":
+            print("-" * 80)
+        p50, p95, p99 = (
+            f"{summary[key]:>9.2f}" if summary[key] is not None else f"{'-':>9}"
+            for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"{name:<10} | {summary['requests']:>10} | {summary['errors']:>7} | {summary['rps']:>8.1f} | "
+              f"{p50} | {p95} | {p99}")
+    for name, counts in report["status"].items():
+        unexpected = {status: count for status, count in counts.items() if not status.startswith(("2", "3"))}
+        if unexpected:
+            print(f"  {name}: respuestas no exitosas {unexpected}")
+    print()
+
+
+def print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]):
+    """Variación de RPS y p95/p99 respecto a un resultado guardado con --save"""
+    print(f"Comparación con la línea base ({baseline['config'].get('saved_at', '?')}):\n")
+    print(f"{'Endpoint':<10} | {'RPS':>9} | {'p95':>9} | {'p99':>9}")
+    print("-" * 46)
+
+    def delta(current, previous) -> str:
+        if current is None or not previous:
+            return f"{'-':>9}"
+        return f"{(current - previous) / previous * 100:>+8.1f}%"
+
+    base_rows = {**baseline["endpoints"], "TOTAL": baseline["total"]}
+    for name, summary in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        previous = base_rows.get(name)
+        if previous is None:
+            continue
+        print(f"{name:<10} | {delta(summary['rps'], previous['rps'])} | "
+              f"{delta(summary['p95_ms'], previous['p95_ms'])} | {delta(summary['p99_ms'], previous['p99_ms'])}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga end-to-end con una BD SQLite local")
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess",
+                        help="App en este proceso (ASGI) o bajo uvicorn en un subproceso")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto de uvicorn")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de medición")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos de calentamiento (no se miden)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Pesos por endpoint (por defecto {DEFAULT_MIX})")
+    parser.add_argument("--seed-rows", type=int, default=10_000, help="Scores precargados en la BD")
+    parser.add_argument("--players", type=int, default=500, help="Jugadores distintos")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de los datos y de la mezcla")
+    parser.add_argument("--db", type=str, default="", help="Archivo SQLite (por defecto uno temporal)")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Latencia simulada por consulta")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variación aleatoria añadida a la latencia")
+    parser.add_argument("--connect-latency-ms", type=float, default=20.0, help="Latencia simulada al abrir una conexión")
+    parser.add_argument("--save", type=str, default="", help="Guardar el resultado en JSON")
+    parser.add_argument("--compare", type=str, default="", help="Comparar con un resultado guardado")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    temporary = None
+    if not args.db:
+        temporary = tempfile.TemporaryDirectory(prefix="snake-bench-")
+        args.db = str(Path(temporary.name) / "snake_scores.db")
+    sqlite_pyodbc.create_schema(args.db, seed_rows=args.seed_rows, players=args.players, seed=args.seed)
+
+    print(f"\nServidor: {args.server} | clientes: {args.concurrency} | duración: {args.duration}s | "
+          f"latencia BD: {args.latency_ms}ms (+{args.jitter_ms}ms) | filas: {args.seed_rows}")
+    print(f"Mezcla: {', '.join(f'{name}={weight:g}' for name, weight in args.mix.items())}")
+
+    try:
+        runner = run_uvicorn if args.server == "uvicorn" else run_inprocess
+        results, elapsed = asyncio.run(runner(args))
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    all_samples = [sample for samples in results.values() for sample in samples]
+    report = {
+        "config": {
+            "server": args.server,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "seed_rows": args.seed_rows,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        },
+        "endpoints": {name: summarize(samples, elapsed) for name, samples in results.items()},
+        "total": summarize(all_samples, elapsed),
+        "status": {name: status_counts(samples) for name, samples in results.items()}
+    }
+    print_report(report)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Resultado guardado en {args.save}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de serialización de las respuestas de scores.
+Compara el camino anterior (FORMAT() en SQL + dict por fila + validación
+con response_model + json.dumps) con el camino rápido actual (datetimes
+nativos + tuplas + encode_json sin revalidar con Pydantic).
+No necesita base de datos: las filas se generan en memoria y pyodbc se
+sustituye por test/bench/sqlite_pyodbc.py (no hace falta el driver ODBC).
+Uso: python test/bench/serialization.py --rows=100,10000
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+# Permitir importar app.main desde la raíz del proyecto
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import sqlite_pyodbc
+
+# app.main importa pyodbc: se registra el sustituto antes de importarla
+sqlite_pyodbc.install()
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.main import SnakeScoreResponse, encode_json, _score_row_to_dict, orjson
+
+
+def make_rows(count: int):
+    """Filas como las devuelve pyodbc: (Id, PlayerName, Score, GameDate, CreatedAt)"""
+    base = datetime(2025, 11, 26, 14, 30, 0)
+    return [
+        (i, f"Jugador {i % 500}", 10_000 - i, base - timedelta(minutes=i), base - timedelta(minutes=i))
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_path(rows, adapter: TypeAdapter) -> bytes:
+    """Camino anterior: fechas ya formateadas por SQL, dict por fila y validación de response_model"""
+    scores = []
+    for row in rows:
+        scores.append({
+            "Id": row[0],
+            "PlayerName": row[1],
+            "Score": row[2],
+            "GameDate": row[3],
+            "CreatedAt": row[4]
+        })
+    validated = adapter.validate_python(scores)
+    return json.dumps(
+        jsonable_encoder(validated),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(rows) -> bytes:
+    """Camino actual: datetimes nativos formateados en Python y encode_json directo"""
+    return encode_json([_score_row_to_dict(row) for row in rows])
+
+
+def measure(func, *args, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de respuestas de scores")
+    parser.add_argument("--rows", type=str, default="100,10000", help="Tamaños de respuesta separados por coma")
+    parser.add_argument("--repeat", type=int, default=50, help="Repeticiones por medición")
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[SnakeScoreResponse])
+    print(f"\nEncoder JSON: {'orjson' if orjson is not None else 'json (stdlib)'}\n")
+    print(f"{'Filas':>8} | {'Anterior (ms)':>14} | {'Rápido (ms)':>12} | {'Mejora':>7}")
+    print("-" * 52)
+
+    for count in (int(value) for value in args.rows.split(",")):
+        fast_rows = make_rows(count)
+        # En el camino anterior SQL Server ya devolvía las fechas como texto
+        legacy_rows = [
+            (r[0], r[1], r[2], r[3].strftime("%Y-%m-%d %H:%M:%S"), r[4].strftime("%Y-%m-%d %H:%M:%S"))
+            for r in fast_rows
+        ]
+        assert json.loads(legacy_path(legacy_rows, adapter)) == json.loads(fast_path(fast_rows))
+
+        legacy = statistics.median(measure(legacy_path, legacy_rows, adapter, repeat=args.repeat)) * 1000
+        fast = statistics.median(measure(fast_path, fast_rows, repeat=args.repeat)) * 1000
+        print(f"{count:>8} | {legacy:>14.3f} | {fast:>12.3f} | {legacy / fast:>6.1f}x")
+
+    print("\nNota: el camino anterior además pagaba FORMAT() por fila dentro de SQL Server.\n")
+
+
+if __name__ == "__main__":
+    main()
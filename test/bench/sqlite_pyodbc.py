@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sustituto de pyodbc sobre SQLite para los benchmarks.
+Implementa la parte de la API de pyodbc que usa app/main.py (connect,
+cursor, execute, executemany, fetch*, commit/rollback) y traduce el
+subconjunto de T-SQL de las consultas de scores: TOP (?), OUTPUT INSERTED,
+GETDATE(), dbo., tablas temporales #. Cada ida y vuelta puede simular la
+latencia de red de Azure SQL con `configure(latency_ms=..., jitter_ms=...)`.
+Uso: install() antes de importar app.main.
+"""
+
+import re
+import sys
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+Error = sqlite3.Error
+DatabaseError = sqlite3.DatabaseError
+OperationalError = sqlite3.OperationalError
+IntegrityError = sqlite3.IntegrityError
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS SnakeScores (
+        Id INTEGER PRIMARY KEY AUTOINCREMENT,
+        PlayerName TEXT NOT NULL,
+        Score INTEGER NOT NULL,
+        GameDate TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        CreatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS IX_SnakeScores_Score ON SnakeScores (Score DESC, GameDate DESC);
+    CREATE INDEX IF NOT EXISTS IX_SnakeScores_PlayerName ON SnakeScores (PlayerName, Score DESC, GameDate DESC, Id DESC);
+"""
+
+# Columnas que SQL Server devuelve como DATETIME
+DATETIME_COLUMNS = frozenset(("GameDate", "CreatedAt"))
+
+_config = {
+    "path": None,
+    "latency": 0.0,
+    "jitter": 0.0,
+    "connect_latency": 0.0
+}
+_stats_lock = threading.Lock()
+_stats = {"connects": 0, "round_trips": 0}
+
+
+def configure(path: str, latency_ms: float = 0.0, jitter_ms: float = 0.0, connect_latency_ms: float = 0.0):
+    """Archivo SQLite a usar y latencia simulada por ida y vuelta (ms)"""
+    _config["path"] = path
+    _config["latency"] = latency_ms / 1000
+    _config["jitter"] = jitter_ms / 1000
+    _config["connect_latency"] = connect_latency_ms / 1000
+
+
+def install():
+    """Registrar este módulo como `pyodbc` (antes de importar app.main)"""
+    sys.modules["pyodbc"] = sys.modules[__name__]
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level="DEFERRED")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def create_schema(path: str, seed_rows: int = 0, players: int = 100, seed: int = 1):
+    """Crear dbo.SnakeScores en `path` y cargar `seed_rows` scores de `players` jugadores"""
+    conn = _open(path)
+    try:
+        conn.executescript(SCHEMA)
+        rng = random.Random(seed)
+        base = datetime.now().replace(microsecond=0)
+        rows = []
+        for i in range(seed_rows):
+            played = (base - timedelta(minutes=seed_rows - i)).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append((f"Jugador {rng.randrange(players)}", rng.randint(0, 5000), played, played))
+        conn.executemany(
+            "INSERT INTO SnakeScores (PlayerName, Score, GameDate, CreatedAt) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _simulate_latency(seconds: float):
+    if _config["jitter"]:
+        seconds += random.uniform(0, _config["jitter"])
+    if seconds > 0:
+        time.sleep(seconds)
+    with _stats_lock:
+        _stats["round_trips"] += 1
+
+
+@lru_cache(maxsize=256)
+def translate(sql: str) -> Tuple[str, bool, bool]:
+    """
+    T-SQL -> SQLite. Devuelve (sql, top_param, noop): `top_param` indica que
+    el primer parámetro era el de TOP (?) y pasa al final como LIMIT ?;
+    `noop` marca sentencias sin equivalente (SET ...) que se ignoran.
+    """
+    stripped = sql.strip()
+    if stripped.upper().startswith("SET "):
+        return "", False, True
+
+    sql = re.sub(r"#(\w+)", r"temp.\1", sql)
+    sql = re.sub(r"N?VARCHAR\(\w+\)", "TEXT", sql)
+    sql = sql.replace("dbo.", "")
+    sql = re.sub(r"GETDATE\(\)|SYSDATETIME\(\)|GETUTCDATE\(\)", "CURRENT_TIMESTAMP", sql)
+
+    output = re.search(r"OUTPUT\s+((?:INSERTED\.\w+\s*,?\s*)+)", sql)
+    if output:
+        columns = output.group(1).replace("INSERTED.", "").strip().rstrip(",")
+        sql = sql.replace(output.group(0), "").rstrip().rstrip(";") + f" RETURNING {columns}"
+
+    top = re.search(r"TOP\s*\((\?|\d+)\)", sql)
+    if top:
+        sql = sql.replace(top.group(0), "", 1).rstrip().rstrip(";") + f" LIMIT {top.group(1)}"
+        return sql, top.group(1) == "?", False
+    return sql, False, False
+
+
+def _to_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+class Row(tuple):
+    """Fila accesible por posición (como pyodbc.Row)"""
+    __slots__ = ()
+
+
+class Cursor:
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+        self._datetime_positions: List[int] = []
+        self._noop = False
+        self.fast_executemany = False
+        self.messages: List[Any] = []
+
+    def _prepare_columns(self):
+        description = self._cursor.description or ()
+        self._datetime_positions = [
+            index for index, column in enumerate(description) if column[0] in DATETIME_COLUMNS
+        ]
+
+    def execute(self, sql: str, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        sql, top_param, self._noop = translate(sql)
+        _simulate_latency(_config["latency"])
+        if self._noop:
+            return self
+        if top_param and params:
+            params = params[1:] + params[:1]
+        params = tuple(value.isoformat(sep=" ") if isinstance(value, datetime) else value for value in params)
+        self._cursor.execute(sql, params)
+        self._prepare_columns()
+        return self
+
+    def executemany(self, sql: str, params_seq):
+        sql, _, noop = translate(sql)
+        _simulate_latency(_config["latency"])
+        if not noop:
+            self._cursor.executemany(sql, params_seq)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def _row(self, row) -> Optional[Row]:
+        if row is None:
+            return None
+        if self._datetime_positions:
+            row = list(row)
+            for index in self._datetime_positions:
+                row[index] = _to_datetime(row[index])
+        return Row(row)
+
+    def fetchone(self):
+        return None if self._noop else self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [] if self._noop else [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size: int = 1):
+        return [] if self._noop else [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def nextset(self) -> bool:
+        return False
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+
+class Connection:
+    def __init__(self, path: str):
+        self._conn = _open(path)
+        self.autocommit = False
+
+    def cursor(self) -> Cursor:
+        return Cursor(self._conn)
+
+    def execute(self, sql: str, *params) -> Cursor:
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(connection_string: str = "", **kwargs) -> Connection:
+    if _config["path"] is None:
+        raise OperationalError("sqlite_pyodbc no configurado: llamar a configure(path) antes")
+    _simulate_latency(_config["connect_latency"])
+    with _stats_lock:
+        _stats["connects"] += 1
+    return Connection(_config["path"])
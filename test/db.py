@@ -4,10 +4,16 @@
 Script para ejecutar archivos SQL contra Azure SQL Database.
 Uso: python db.py --file=test.sql
 Los archivos .sql deben estar en la carpeta DB/
+
+También aplica migraciones versionadas (carpeta DB/migrations/):
+  python db.py --migrate   Aplica las migraciones pendientes
+  python db.py --status    Muestra qué migraciones están aplicadas
 """
 
 import sys
 import os
+import re
+import hashlib
 import argparse
 import pyodbc
 from pathlib import Path
@@ -127,13 +133,19 @@ def read_sql_file(filename):
         sys.exit(1)
 
 
+def split_batches(sql_content):
+    """Dividir un script en lotes separados por líneas que solo contienen GO"""
+    batches = re.split(r'^\s*GO\s*;?\s*$', sql_content, flags=re.MULTILINE | re.IGNORECASE)
+    return [batch.strip() for batch in batches if batch.strip()]
+
+
 def execute_sql(conn, sql_content, filename):
     """Ejecuta el contenido SQL y muestra los resultados"""
     try:
         cursor = conn.cursor()
         
         # Dividir el contenido en declaraciones individuales (separadas por GO)
-        statements = [stmt.strip() for stmt in sql_content.split('GO') if stmt.strip()]
+        statements = split_batches(sql_content)
         
         print(f"\n{'='*60}")
         print(f"Ejecutando: {filename}")
@@ -199,6 +211,158 @@ def execute_sql(conn, sql_content, filename):
         sys.exit(1)
 
 
+# ============================================================
+# Migraciones versionadas
+# ============================================================
+
+MIGRATIONS_TABLE = "dbo.SchemaMigrations"
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(.+)\.sql$', re.IGNORECASE)
+
+
+def load_migrations():
+    """Lee las migraciones de DB/migrations/ ordenadas por versión"""
+    migrations_folder = Path(__file__).resolve().parent / "DB" / "migrations"
+    migrations = []
+    
+    for sql_file in sorted(migrations_folder.glob("*.sql")):
+        match = MIGRATION_FILE_PATTERN.match(sql_file.name)
+        if not match:
+            print(f"⚠ Advertencia: Se ignora '{sql_file.name}' (formato esperado: 0001_descripcion.sql)")
+            continue
+        
+        content = sql_file.read_text(encoding='utf-8')
+        migrations.append({
+            "version": int(match.group(1)),
+            "name": match.group(2),
+            "file": sql_file.name,
+            "sql": content,
+            "checksum": hashlib.sha256(content.encode('utf-8')).hexdigest()
+        })
+    
+    versions = [m["version"] for m in migrations]
+    if len(versions) != len(set(versions)):
+        print("✗ Error: Hay migraciones con el mismo número de versión")
+        sys.exit(1)
+    
+    return sorted(migrations, key=lambda m: m["version"])
+
+
+def ensure_migrations_table(conn):
+    """Crea la tabla de control de migraciones si no existe"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        IF OBJECT_ID('{MIGRATIONS_TABLE}', 'U') IS NULL
+            CREATE TABLE {MIGRATIONS_TABLE} (
+                Version INT NOT NULL PRIMARY KEY,
+                Name NVARCHAR(200) NOT NULL,
+                Checksum CHAR(64) NOT NULL,
+                AppliedAt DATETIME NOT NULL DEFAULT GETDATE()
+            );
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def get_applied_migrations(conn):
+    """Devuelve {version: (nombre, checksum, fecha)} de las migraciones aplicadas"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT Version, Name, Checksum, AppliedAt FROM {MIGRATIONS_TABLE} ORDER BY Version")
+    applied = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+    cursor.close()
+    return applied
+
+
+def apply_migration(conn, migration):
+    """Aplica una migración y la registra, todo en una misma transacción"""
+    cursor = conn.cursor()
+    batches = split_batches(migration["sql"])
+    
+    print(f"→ Aplicando {migration['file']} ({len(batches)} lotes)...")
+    try:
+        for batch in batches:
+            cursor.execute(batch)
+            # Consumir posibles resultados para poder seguir con el siguiente lote
+            while cursor.nextset():
+                pass
+        cursor.execute(
+            f"INSERT INTO {MIGRATIONS_TABLE} (Version, Name, Checksum) VALUES (?, ?, ?)",
+            migration["version"], migration["name"], migration["checksum"]
+        )
+        conn.commit()
+        print(f"✓ Migración {migration['version']:04d} aplicada")
+    except pyodbc.Error as e:
+        conn.rollback()
+        print(f"✗ Error en la migración {migration['file']}: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def run_migrations(conn):
+    """Aplica en orden las migraciones pendientes (idempotente)"""
+    ensure_migrations_table(conn)
+    
+    # Bloqueo de aplicación: evita que dos ejecuciones migren a la vez
+    # (0 o 1 = concedido; < 0 = timeout, cancelado, deadlock o error)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SET NOCOUNT ON; DECLARE @r int; "
+        "EXEC @r = sp_getapplock @Resource = 'SchemaMigrations', @LockMode = 'Exclusive', "
+        "@LockOwner = 'Session', @LockTimeout = 60000; "
+        "SET NOCOUNT OFF; SELECT @r"
+    )
+    lock_result = cursor.fetchone()[0]
+    if lock_result < 0:
+        cursor.close()
+        print(f"\n✗ No se pudo obtener el bloqueo de migraciones (sp_getapplock = {lock_result}): "
+              "otra ejecución está migrando\n")
+        sys.exit(1)
+    
+    try:
+        applied = get_applied_migrations(conn)
+        pending = []
+        for migration in load_migrations():
+            if migration["version"] in applied:
+                _, checksum, _ = applied[migration["version"]]
+                if checksum != migration["checksum"]:
+                    print(f"⚠ Advertencia: {migration['file']} cambió después de aplicarse (no se vuelve a ejecutar)")
+                continue
+            pending.append(migration)
+        
+        print(f"\n{'='*60}")
+        print(f"Migraciones pendientes: {len(pending)}")
+        print(f"{'='*60}\n")
+        
+        for migration in pending:
+            apply_migration(conn, migration)
+        
+        print(f"\n✓ Esquema actualizado ({len(applied) + len(pending)} migraciones aplicadas)\n")
+    except pyodbc.Error:
+        print("\n✗ Migración interrumpida; las migraciones anteriores quedan aplicadas\n")
+        sys.exit(1)
+    finally:
+        cursor.execute("EXEC sp_releaseapplock @Resource = 'SchemaMigrations', @LockOwner = 'Session'")
+        conn.commit()
+        cursor.close()
+
+
+def show_migration_status(conn):
+    """Muestra el estado de cada migración"""
+    ensure_migrations_table(conn)
+    applied = get_applied_migrations(conn)
+    
+    print(f"\n{'Versión':<8} | {'Estado':<10} | {'Aplicada':<19} | Archivo")
+    print("-" * 70)
+    for migration in load_migrations():
+        if migration["version"] in applied:
+            _, checksum, applied_at = applied[migration["version"]]
+            state = "aplicada" if checksum == migration["checksum"] else "modificada"
+            print(f"{migration['version']:<8} | {state:<10} | {applied_at:%Y-%m-%d %H:%M:%S} | {migration['file']}")
+        else:
+            print(f"{migration['version']:<8} | {'pendiente':<10} | {'':<19} | {migration['file']}")
+    print()
+
+
 def main():
     """Función principal"""
     # Configurar argumentos de línea de comandos
@@ -210,17 +374,30 @@ Ejemplos de uso:
   python db.py --file=test.sql
   python db.py --file=create_tables.sql
   python db.py --file=seed_data.sql
+  python db.py --migrate
+  python db.py --status
 
 Los archivos .sql deben estar ubicados en la carpeta DB/
+Las migraciones están en DB/migrations/ (formato: 0001_descripcion.sql)
         """
     )
     
-    parser.add_argument(
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument(
         '--file',
         type=str,
-        required=True,
         help='Nombre del archivo SQL a ejecutar (debe estar en la carpeta DB/)'
     )
+    action.add_argument(
+        '--migrate',
+        action='store_true',
+        help='Aplicar las migraciones pendientes de DB/migrations/'
+    )
+    action.add_argument(
+        '--status',
+        action='store_true',
+        help='Mostrar el estado de las migraciones'
+    )
     
     args = parser.parse_args()
     
@@ -229,14 +406,19 @@ Los archivos .sql deben estar ubicados en la carpeta DB/
     print("="*60 + "\n")
     
     # Leer archivo SQL
-    sql_content = read_sql_file(args.file)
+    sql_content = read_sql_file(args.file) if args.file else None
     
     # Conectar a la base de datos
     conn = get_db_connection()
     
     try:
-        # Ejecutar SQL
-        execute_sql(conn, sql_content, args.file)
+        if args.migrate:
+            run_migrations(conn)
+        elif args.status:
+            show_migration_status(conn)
+        else:
+            # Ejecutar SQL
+            execute_sql(conn, sql_content, args.file)
     finally:
         # Cerrar conexión
         conn.close()